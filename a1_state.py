@@ -9,6 +9,23 @@ Student ID:
 """
 State class for the Hinger game
 """
+import random
+from collections import namedtuple
+from itertools import chain
+from operator import itemgetter
+
+# The 8 directions to a cell's neighbours (as row, column offsets).
+DIRECTIONS = (
+    (-1,-1), # diagonal up-left
+    (-1,0),  # above
+    (-1,1),  # diagonal up-right
+    (0,-1),  # left
+    (0,1),   # right
+    (1,-1),  # diagonal down-left
+    (1,0),   # down
+    (1,1)    # diagonal down-right
+)
+
 class State:
     def __init__(self, grid):
         """
@@ -19,6 +36,13 @@ class State:
         self.grid = [row[:] for row in grid]
         self.rows = len(grid)
         self.cols = len(grid[0])
+        self.history = []   # moves made with apply(), most recent last
+        # neighbours[r][c] lists the on-board neighbours of (r, c); the table
+        # is shared by every state of this size (see neighbour_table).
+        self.neighbours = neighbour_table(self.rows, self.cols).positions
+        # 64-bit Zobrist hash of the board, kept up to date by moves(),
+        # apply() and undo(). Changing grid directly makes it stale.
+        self.zobrist = _zobrist_hash(self.grid_cells(), self.rows, self.cols)
     
     def __str__(self):
         """
@@ -27,18 +51,180 @@ class State:
         """
         return '\n'.join(' '.join(str(cell) for cell in row) for row in self.grid)
     
-    def moves(self):
+    def moves(self, end=None, reduce=False):
         """
         c. A generator method named moves() that yields all possible states reachable
         in one move (i.e., removing one counter from any active cell).
         Each yeilded value is a truple (new_state, move_position, move_cost)
+        If a goal state end is given, only cells holding more counters than in
+        end are used: counters are never put back, so the other moves can
+        never reach end.
+        With reduce=True only the moves in focusRegion(end) are used.
         """
+        floor = self._floor(end)
+        focus = self.focusRegion(end) if reduce else None
         for r in range(self.rows):
             for c in range(self.cols):
-                if self.grid[r][c] > 0:
+                if self.grid[r][c] > floor[r][c] and (focus is None or r*self.cols + c in focus):
                     new_state = self.clone()
                     new_state.grid[r][c] -= 1
+                    new_state.zobrist ^= _zobrist_delta(self.rows, self.cols, r*self.cols + c, self.grid[r][c])
                     yield (new_state, (r,c), self.move_cost(r, c))
+
+    def predecessors(self, start):
+        """
+        Yields (previous_state, move_position, move_cost) for every state that
+        reaches this one in one move and can itself be reached from start,
+        i.e. this state with a counter put back on a cell that has fewer
+        counters than in start. move_cost is the cost of the move from the
+        previous state. Used to search backwards from a goal.
+        """
+        for r in range(self.rows):
+            for c in range(self.cols):
+                if self.grid[r][c] < start.grid[r][c]:
+                    new_state = self.clone()
+                    new_state.grid[r][c] += 1
+                    new_state.zobrist ^= _zobrist_delta(self.rows, self.cols, r*self.cols + c, new_state.grid[r][c])
+                    yield (new_state, (r,c), new_state.move_cost(r, c))
+
+    def legalMoves(self, end=None, reduce=False):
+        """
+        Yields (move_position, move_cost) for every active cell without building
+        any new states. Used together with apply() and undo() by searches that
+        walk down and back up the tree on a single state. The board must be the
+        same each time the generator resumes, i.e. every apply() is undone first.
+        end and reduce limit the moves the same way as in moves().
+        """
+        floor = self._floor(end)
+        focus = self.focusRegion(end) if reduce else None
+        for r in range(self.rows):
+            for c in range(self.cols):
+                if self.grid[r][c] > floor[r][c] and (focus is None or r*self.cols + c in focus):
+                    yield (r, c), self.move_cost(r, c)
+
+    def focusRegion(self, end=None):
+        """
+        Returns the cells (as flat indices) of the region holding the first
+        cell, row by row, with counters to spare over end (or any counter, if
+        there is no goal); empty if there is none.
+        Moves in different regions never affect each other: regions only
+        split as counters are removed, and a move's cost and whether a cell
+        is a hinger depend only on its own region. So any safe path can be
+        reordered to finish one region before touching the next, with the
+        same cost and every state along the way still safe. Searching only
+        the moves in this region therefore loses no paths and no costs,
+        while skipping every other ordering of the same removals.
+        """
+        cells = self.grid_cells()
+        floor = end.grid_cells() if end is not None else bytes(len(cells))
+        for first, count in enumerate(cells):
+            if count > floor[first]:
+                break
+        else:
+            return set()
+        neighbours = neighbour_table(self.rows, self.cols).indices
+        region = {first}
+        stack = [first]
+        while stack:
+            for i in neighbours[stack.pop()]:
+                if cells[i] > 0 and i not in region:
+                    region.add(i)
+                    stack.append(i)
+        return region
+
+    def _floor(self, end):
+        """
+        Returns the grid of counts a cell must stay above to be moved on:
+        end's counts, or all zeros when there is no goal.
+        """
+        return end.grid if end is not None else [[0] * self.cols] * self.rows
+
+    def apply(self, r, c):
+        """
+        Removes one counter from (r, c) in place and remembers the move, so it
+        can be reversed exactly with undo().
+        """
+        self.zobrist ^= _zobrist_delta(self.rows, self.cols, r*self.cols + c, self.grid[r][c])
+        self.grid[r][c] -= 1
+        self.history.append((r, c))
+
+    def undo(self):
+        """
+        Puts back the counter removed by the most recent apply() and returns
+        that move.
+        """
+        r, c = self.history.pop()
+        self.grid[r][c] += 1
+        self.zobrist ^= _zobrist_delta(self.rows, self.cols, r*self.cols + c, self.grid[r][c])
+        return (r, c)
+
+    def key(self):
+        """
+        Returns a key for this state to use in sets and dictionaries. It hashes
+        with the Zobrist hash in O(1), and the grids are only compared when two
+        hashes match. The state must not be changed while its key is in use.
+        """
+        return ZobristKey(self)
+
+    def grid_cells(self):
+        """
+        Returns the counters as one flat list, row by row.
+        """
+        return list(chain.from_iterable(self.grid))
+
+    def symmetries(self):
+        """
+        Returns the board symmetries (see SYMMETRIES) that keep the board's shape:
+        all 8 on a square board, the 4 that do not swap rows and columns otherwise.
+        Move costs, regions and hingers are the same after any of them.
+        """
+        return list(_symmetry_getters(self.rows, self.cols))
+
+    def canonical(self, transforms=None):
+        """
+        Returns (key, transform) where key is the same for every rotation or
+        reflection of this board, and transform is the symmetry that turns
+        this board into the canonical one. Use mapMove/unmapMove with the
+        transform to move positions between the two boards. transforms can
+        limit which symmetries are tried (e.g. the ones that keep a goal
+        state unchanged).
+        """
+        cells = self.grid_cells()
+        best_key, best_transform = None, 0
+        for transform, getter in _symmetry_getters(self.rows, self.cols).items():
+            if transforms is not None and transform not in transforms:
+                continue
+            key = getter(cells)
+            if best_key is None or key < best_key:
+                best_key, best_transform = key, transform
+        return best_key, best_transform
+
+    def fixedSymmetries(self):
+        """
+        Returns the symmetries that leave this board exactly as it is.
+        """
+        cells = self.grid_cells()
+        identity = tuple(cells)
+        return [transform for transform, getter in _symmetry_getters(self.rows, self.cols).items()
+                if getter(cells) == identity]
+
+    def mapMove(self, move, transform):
+        """
+        Returns where the cell at move ends up after the board is transformed.
+        """
+        r, c = move
+        n_r, n_c = self.rows - 1, self.cols - 1
+        return [
+            (r, c), (c, n_r - r), (n_r - r, n_c - c), (n_c - c, r),
+            (n_r - r, c), (r, n_c - c), (c, r), (n_c - c, n_r - r)
+        ][transform]
+
+    def unmapMove(self, move, transform):
+        """
+        Inverse of mapMove(): takes a position on the transformed board back
+        to the original board.
+        """
+        return self.mapMove(move, INVERSE_SYMMETRY[transform])
  
        
     def numRegions(self):
@@ -48,18 +234,17 @@ class State:
         """
         visited = [[False]*self.cols for _ in range(self.rows)]
         regions = 0
+        grid, neighbours = self.grid, self.neighbours
 
         def bfs(sr, sc):
             queue = [(sr, sc)]
             visited[sr][sc] = True
             while queue:
-                r, c = queue.pop(0)
-                for dr, dc in self.directions():
-                    nr, nc = r+dr, c+dc
-                    if 0 <= nr < self.rows and 0 <= nc < self.cols:
-                        if self.grid[nr][nc] > 0 and not visited[nr][nc]:
-                            visited[nr][nc] = True
-                            queue.append((nr,nc))
+                r, c = queue.pop()
+                for nr, nc in neighbours[r][c]:
+                    if grid[nr][nc] > 0 and not visited[nr][nc]:
+                        visited[nr][nc] = True
+                        queue.append((nr,nc))
 
         for r in range(self.rows):
             for c in range(self.cols):
@@ -74,37 +259,30 @@ class State:
         state.
         A hinger is a cell with 1 counter that, when removed, increases the number of regions.
         """
-        original_regions = self.numRegions()
-        hinger_count = 0
+        return len(self.hingerCells())
 
-        for r in range(self.rows):
-            for c in range(self.cols):
-                if self.grid[r][c] == 1:
-                    self.grid[r][c] = 0
-                    new_regions = self.numRegions()
-                    self.grid[r][c] = 1
-
-                    if new_regions > original_regions:
-                        hinger_count += 1
-
-        return hinger_count
+    def hingerCells(self):
+        """
+        Returns the set of hinger cells as (r, c) positions.
+        Found with a single pass over the board (see _find_hingers) instead of
+        removing each counter in turn and recounting the regions.
+        """
+        return _find_hingers(self.grid_cells(), self.rows, self.cols)
     
+    def isHinger(self, r, c):
+        """
+        Returns True if (r, c) is a hinger cell.
+        """
+        return (r, c) in self.hingerCells()
+
     def directions(self):
         """
         f. Any additional utility methods that support gameplay logic or improve code
         clarity.
         Returns all directions a player can move.
+        The searches use the precomputed neighbour_table() instead.
         """
-        return [
-            (-1,-1), #diagonal up-left
-            (-1,0),  # above 
-            (-1,1),  # diagonal up-right
-            (0,-1),  # left
-            (0,1),   # right
-            (1,-1),  # diagonal down-left
-            (1,0),   # down
-            (1,1)    # diagonal down-right
-        ]
+        return DIRECTIONS
     
 
     
@@ -117,11 +295,10 @@ class State:
         Additional utility to support game play.
         """
         cost = 1
-        for dr, dc in self.directions():
-            nr, nc = r+dr, c+dc 
-            if 0 <= nr < self.rows and 0 <= nc < self.cols:
-                if self.grid[nr][nc] > 0:
-                    cost += 1
+        grid = self.grid
+        for nr, nc in self.neighbours[r][c]:
+            if grid[nr][nc] > 0:
+                cost += 1
         return cost
     
     def clone(self):
@@ -131,10 +308,496 @@ class State:
         Returns a deepcopy of the state.
         Used from Taoyangs code from lab1 part 2
         https://docs.python.org/3.12/library/copy.html
+        The Zobrist hash is copied rather than worked out again.
         """
-        return State([row[:] for row in self.grid])
-        
-    
+        new_state = self.__class__.__new__(self.__class__)
+        new_state.grid = [row[:] for row in self.grid]
+        new_state.rows = self.rows
+        new_state.cols = self.cols
+        new_state.history = []
+        new_state.neighbours = self.neighbours
+        new_state.zobrist = self.zobrist
+        return new_state
+
+
+class CompactState:
+    """
+    Compact, immutable version of State for use inside the searches.
+    The counters are packed row by row into one bytes buffer (so each cell
+    holds 0-255 counters), which means a node costs a single small object
+    instead of a list per row. Compact states are hashable and compare equal
+    when their boards are the same, so they can be used directly as keys.
+    It has the same public methods as State, so it can be passed to the
+    functions in a2_path and to the Agent in place of a State.
+    """
+    __slots__ = ('cells', 'rows', 'cols', 'zobrist')
+
+    def __init__(self, grid):
+        assert all(len(row) == len(grid[0]) for row in grid)
+        self.rows = len(grid)
+        self.cols = len(grid[0])
+        self.cells = bytes(cell for row in grid for cell in row)
+        self.zobrist = _zobrist_hash(self.cells, self.rows, self.cols)
+
+    @classmethod
+    def _from_cells(cls, rows, cols, cells, zobrist):
+        """Builds a state straight from a packed buffer, skipping the grid."""
+        new_state = cls.__new__(cls)
+        new_state.rows = rows
+        new_state.cols = cols
+        new_state.cells = cells
+        new_state.zobrist = zobrist
+        return new_state
+
+    @property
+    def grid(self):
+        """
+        Returns the board as a 2D list, the same as State.grid.
+        The list is a copy, so changing it does not change the state.
+        """
+        cols = self.cols
+        return [list(self.cells[i:i + cols]) for i in range(0, len(self.cells), cols)]
+
+    def __str__(self):
+        return '\n'.join(' '.join(str(cell) for cell in row) for row in self.grid)
+
+    def __eq__(self, other):
+        if not isinstance(other, CompactState):
+            return NotImplemented
+        return self.zobrist == other.zobrist and self.cols == other.cols and self.cells == other.cells
+
+    def __hash__(self):
+        return self.zobrist
+
+    def key(self):
+        """Compact states are immutable and hash by Zobrist, so they are their own key."""
+        return self
+
+    def grid_cells(self):
+        """Returns the counters as one flat sequence, row by row."""
+        return self.cells
+
+    def moves(self, end=None, reduce=False):
+        """
+        Yields (new_state, move_position, move_cost) for every active cell
+        (above end, if given), the same as State.moves(). Only the packed
+        buffer is rebuilt.
+        """
+        cells = self.cells
+        neighbours = neighbour_table(self.rows, self.cols).indices
+        floor = end.grid_cells() if end is not None else bytes(len(cells))
+        focus = self.focusRegion(end) if reduce else None
+        for i, count in enumerate(cells):
+            if count > floor[i] and (focus is None or i in focus):
+                new_cells = cells[:i] + bytes((count - 1,)) + cells[i + 1:]
+                zobrist = self.zobrist ^ _zobrist_delta(self.rows, self.cols, i, count)
+                cost = 1 + sum(1 for j in neighbours[i] if cells[j] > 0)
+                yield (CompactState._from_cells(self.rows, self.cols, new_cells, zobrist), divmod(i, self.cols), cost)
+
+    def predecessors(self, start):
+        """
+        Yields (previous_state, move_position, move_cost) for every state one
+        move before this one, the same as State.predecessors().
+        """
+        cells = self.cells
+        neighbours = neighbour_table(self.rows, self.cols).indices
+        ceiling = start.grid_cells()
+        for i, count in enumerate(cells):
+            if count < ceiling[i]:
+                new_cells = cells[:i] + bytes((count + 1,)) + cells[i + 1:]
+                zobrist = self.zobrist ^ _zobrist_delta(self.rows, self.cols, i, count + 1)
+                cost = 1 + sum(1 for j in neighbours[i] if cells[j] > 0)
+                yield (CompactState._from_cells(self.rows, self.cols, new_cells, zobrist), divmod(i, self.cols), cost)
+
+    def numRegions(self):
+        """Returns the number of active regions on the board."""
+        return self._count_regions(self.cells)
+
+    def _count_regions(self, cells):
+        """
+        Counts the active regions of a flat board (bytes or bytearray) with
+        the same size as this state.
+        """
+        neighbours = neighbour_table(self.rows, self.cols).indices
+        visited = [False] * len(cells)
+        regions = 0
+        for start, count in enumerate(cells):
+            if count == 0 or visited[start]:
+                continue
+            regions += 1
+            visited[start] = True
+            stack = [start]
+            while stack:
+                for i in neighbours[stack.pop()]:
+                    if cells[i] > 0 and not visited[i]:
+                        visited[i] = True
+                        stack.append(i)
+        return regions
+
+    def numHingers(self):
+        """Returns the number of hinger cells, the same as State.numHingers()."""
+        return len(self.hingerCells())
+
+    def hingerCells(self):
+        """Returns the set of hinger cells, the same as State.hingerCells()."""
+        return _find_hingers(self.cells, self.rows, self.cols)
+
+    isHinger = State.isHinger
+    focusRegion = State.focusRegion
+    directions = State.directions
+    symmetries = State.symmetries
+    canonical = State.canonical
+    fixedSymmetries = State.fixedSymmetries
+    mapMove = State.mapMove
+    unmapMove = State.unmapMove
+
+    def move_cost(self, r, c):
+        """Returns the cost of a move at (r, c), the same as State.move_cost()."""
+        cells = self.cells
+        return 1 + sum(1 for i in neighbour_table(self.rows, self.cols).indices[r*self.cols + c] if cells[i] > 0)
+
+    def clone(self):
+        """
+        Compact states are never changed, so the copy shares the buffer
+        with the original.
+        """
+        return CompactState._from_cells(self.rows, self.cols, self.cells, self.zobrist)
+
+
+class TrackedState(State):
+    """
+    State for playing a game, which keeps the region labelling, the number
+    of active neighbours of every cell and the current hinger set up to date
+    as moves are applied and undone. numRegions(), numHingers(), isHinger()
+    and move_cost() are then O(1) lookups.
+    Counters are only ever removed during play, so a move only changes the
+    board when it empties a cell; then only the region that held the cell
+    is labelled again and searched for articulation points. undo() does the
+    same for the region the restored cell joins back together.
+    The grid must only be changed through apply() and undo().
+    """
+    def __init__(self, grid):
+        super().__init__(grid)
+        self.cells = self.grid_cells()
+        size = len(self.cells)
+        self.neighbour_indices = neighbour_table(self.rows, self.cols).indices
+        self.neighbour_counts = [
+            sum(1 for j in self.neighbour_indices[i] if self.cells[j] > 0) for i in range(size)
+        ]
+        self.labels = [-1] * size     # region label of each cell, -1 if empty
+        self.regions = {}             # label -> set of cells in that region
+        self.articulation = {}        # label -> articulation points of that region
+        self.hingers = set()
+        self._next_label = 0
+        for i in range(size):
+            if self.cells[i] > 0 and self.labels[i] == -1:
+                self._label_region(i)
+
+    def _label_region(self, start):
+        """
+        Gives a new label to the region containing start and finds its
+        articulation points and hingers.
+        """
+        label = self._next_label
+        self._next_label += 1
+        cells, labels = self.cells, self.labels
+        members = {start}
+        labels[start] = label
+        stack = [start]
+        while stack:
+            for j in self.neighbour_indices[stack.pop()]:
+                if cells[j] > 0 and labels[j] != label:
+                    labels[j] = label
+                    members.add(j)
+                    stack.append(j)
+        self.regions[label] = members
+        points = _articulation_points(cells, self.rows, self.cols, (start,))
+        self.articulation[label] = points
+        for j in points:
+            if cells[j] == 1:
+                self.hingers.add(divmod(j, self.cols))
+
+    def _drop_region(self, label):
+        """Forgets a region and its hingers, returning the cells it had."""
+        for j in self.articulation.pop(label):
+            self.hingers.discard(divmod(j, self.cols))
+        return self.regions.pop(label)
+
+    def apply(self, r, c):
+        super().apply(r, c)
+        i = r*self.cols + c
+        self.cells[i] -= 1
+        if self.cells[i] == 0:
+            # The cell has gone, so its region may have split in pieces.
+            for j in self.neighbour_indices[i]:
+                self.neighbour_counts[j] -= 1
+            old_label = self.labels[i]
+            members = self._drop_region(old_label)
+            members.discard(i)
+            self.labels[i] = -1
+            for j in members:
+                if self.labels[j] == old_label:
+                    self._label_region(j)
+        elif self.cells[i] == 1 and i in self.articulation[self.labels[i]]:
+            self.hingers.add((r, c))
+
+    def undo(self):
+        r, c = super().undo()
+        i = r*self.cols + c
+        self.cells[i] += 1
+        if self.cells[i] == 1:
+            # The cell is back, joining the regions around it into one.
+            for j in self.neighbour_indices[i]:
+                self.neighbour_counts[j] += 1
+            for label in {self.labels[j] for j in self.neighbour_indices[i] if self.cells[j] > 0}:
+                self._drop_region(label)
+            self._label_region(i)
+        elif self.cells[i] == 2:
+            self.hingers.discard((r, c))
+        return (r, c)
+
+    def moves(self, end=None, reduce=False):
+        """
+        Yields (new_state, move_position, move_cost) like State.moves(), with
+        each new state's tracking data updated from this one. Not meant for
+        searches: every child copies the region, articulation point and
+        hinger sets, which costs more than a plain State's children. Search
+        a State(grid) of the board instead.
+        """
+        for (r, c), cost in self.legalMoves(end, reduce):
+            new_state = self.clone()
+            new_state.apply(r, c)
+            new_state.history = []
+            yield (new_state, (r, c), cost)
+
+    def predecessors(self, start):
+        """Like State.predecessors(), with each previous state tracked from scratch."""
+        for previous, move, cost in State(self.grid).predecessors(start):
+            yield (TrackedState(previous.grid), move, cost)
+
+    def numRegions(self):
+        return len(self.regions)
+
+    def numHingers(self):
+        return len(self.hingers)
+
+    def hingerCells(self):
+        return set(self.hingers)
+
+    def isHinger(self, r, c):
+        return (r, c) in self.hingers
+
+    def focusRegion(self, end=None):
+        """
+        Same as State.focusRegion(), read from the region labels. A copy is
+        returned, since apply() changes the region sets in place.
+        """
+        floor = end.grid_cells() if end is not None else bytes(len(self.cells))
+        for i, count in enumerate(self.cells):
+            if count > floor[i]:
+                return set(self.regions[self.labels[i]])
+        return set()
+
+    def move_cost(self, r, c):
+        return 1 + self.neighbour_counts[r*self.cols + c]
+
+    def clone(self):
+        """Copies the state together with its tracking data."""
+        new_state = super().clone()
+        new_state.cells = self.cells[:]
+        new_state.neighbour_indices = self.neighbour_indices
+        new_state.neighbour_counts = self.neighbour_counts[:]
+        new_state.labels = self.labels[:]
+        new_state.regions = {label: set(members) for label, members in self.regions.items()}
+        new_state.articulation = {label: set(points) for label, points in self.articulation.items()}
+        new_state.hingers = set(self.hingers)
+        new_state._next_label = self._next_label
+        return new_state
+
+
+class ZobristKey:
+    """
+    Hashable key for a (mutable) State, returned by State.key(). It hashes
+    with the state's Zobrist hash, so building and looking up a key is O(1);
+    the full grids are only compared when two hashes are equal.
+    """
+    __slots__ = ('zobrist', 'state')
+
+    def __init__(self, state):
+        self.zobrist = state.zobrist
+        self.state = state
+
+    def __hash__(self):
+        return self.zobrist
+
+    def __eq__(self, other):
+        if not isinstance(other, ZobristKey):
+            return NotImplemented
+        return self.zobrist == other.zobrist and self.state.grid == other.state.grid
+
+
+# Neighbour tables for one board size, shared by every state of that size:
+# indices[i] holds the flat indices (r * cols + c) of the on-board
+# neighbours of flat cell i, and positions[r][c] the same cells as (r, c).
+NeighbourTable = namedtuple('NeighbourTable', ['indices', 'positions'])
+_neighbour_tables = {}
+
+
+def neighbour_table(rows, cols):
+    """
+    Returns the NeighbourTable for a board size, building it the first time
+    that size is seen. The neighbour loops use it instead of applying
+    DIRECTIONS and checking the bounds for every neighbour of every cell.
+    """
+    table = _neighbour_tables.get((rows, cols))
+    if table is None:
+        positions = tuple(
+            tuple(
+                tuple((r+dr, c+dc) for dr, dc in DIRECTIONS if 0 <= r+dr < rows and 0 <= c+dc < cols)
+                for c in range(cols)
+            )
+            for r in range(rows)
+        )
+        indices = tuple(
+            tuple(nr * cols + nc for nr, nc in cell) for row in positions for cell in row
+        )
+        table = _neighbour_tables[(rows, cols)] = NeighbourTable(indices, positions)
+    return table
+
+
+# Rotations and reflections of the board, by number:
+# 0 identity, 1 rotate 90 clockwise, 2 rotate 180, 3 rotate 270 clockwise,
+# 4 flip top to bottom, 5 flip left to right, 6 transpose, 7 anti-transpose.
+SYMMETRIES = ('identity', 'rot90', 'rot180', 'rot270', 'flip_rows', 'flip_cols', 'transpose', 'anti_transpose')
+INVERSE_SYMMETRY = (0, 3, 2, 1, 4, 5, 6, 7)
+
+# (rows, cols) -> {transform: itemgetter that reorders a flat board}
+_symmetry_tables = {}
+
+
+def _symmetry_getters(rows, cols):
+    """
+    Returns, for each symmetry that keeps the board's shape, an itemgetter
+    that builds the transformed flat board as a tuple. They are built once
+    per board size so canonical() is just a few C-level calls per state.
+    """
+    getters = _symmetry_tables.get((rows, cols))
+    if getters is not None:
+        return getters
+    transforms = range(8) if rows == cols else (0, 2, 4, 5)
+    probe = State.__new__(State)
+    probe.rows, probe.cols = rows, cols
+    getters = {}
+    for transform in transforms:
+        order = [0] * (rows * cols)
+        for r in range(rows):
+            for c in range(cols):
+                nr, nc = probe.mapMove((r, c), transform)
+                order[nr * cols + nc] = r * cols + c
+        if len(order) == 1:
+            getters[transform] = tuple
+        else:
+            getters[transform] = itemgetter(*order)
+    _symmetry_tables[(rows, cols)] = getters
+    return getters
+
+
+# Zobrist keys per board size: _zobrist_tables[(rows, cols)][cell][count] is
+# the random 64-bit key for that cell holding that many counters. Entry 0 is
+# always 0 so empty cells do not change the hash. Levels are added on demand.
+_zobrist_tables = {}
+
+
+def _zobrist_keys(rows, cols, index, count):
+    """
+    Returns the Zobrist key list for one cell, grown to at least count.
+    Keys are seeded from the board size, cell and level, so every process
+    (and every run) gets the same hashes.
+    """
+    table = _zobrist_tables.get((rows, cols))
+    if table is None:
+        table = _zobrist_tables[(rows, cols)] = [[0] for _ in range(rows * cols)]
+    keys = table[index]
+    while len(keys) <= count:
+        keys.append(random.Random(f"{rows}x{cols}:{index}:{len(keys)}").getrandbits(64))
+    return keys
+
+
+def _zobrist_hash(cells, rows, cols):
+    """Works out the Zobrist hash of a flat board from scratch."""
+    h = 0
+    for i, count in enumerate(cells):
+        if count:
+            h ^= _zobrist_keys(rows, cols, i, count)[count]
+    return h
+
+
+def _zobrist_delta(rows, cols, index, count):
+    """
+    Returns the value to XOR into the hash when the cell at index goes
+    between count and count - 1 counters (in either direction).
+    """
+    keys = _zobrist_keys(rows, cols, index, count)
+    return keys[count] ^ keys[count - 1]
+
+
+def _find_hingers(cells, rows, cols):
+    """
+    Finds the hinger cells of a board stored row by row in a flat sequence.
+    Removing a cell splits its region exactly when the cell is an
+    articulation point of the graph of active cells (joined to their 8
+    neighbours), so a hinger is an articulation point holding 1 counter.
+    """
+    points = _articulation_points(cells, rows, cols, range(rows * cols))
+    return {divmod(i, cols) for i in points if cells[i] == 1}
+
+
+def _articulation_points(cells, rows, cols, starts):
+    """
+    Returns the flat indices of the articulation points in the regions that
+    contain the cells in starts, using Tarjan's algorithm in a single
+    depth-first pass. Only those regions are visited, so TrackedState can
+    use it on the one region a move touched. Written with an explicit stack
+    so large boards do not hit the recursion limit.
+    """
+    neighbours = neighbour_table(rows, cols).indices
+    disc = {}   # discovery time of each visited cell
+    low = {}    # lowest discovery time reachable through the subtree
+    points = set()
+    time = 1
+
+    for root in starts:
+        if cells[root] == 0 or root in disc:
+            continue
+        disc[root] = low[root] = time
+        time += 1
+        root_children = 0
+        stack = [(root, iter(neighbours[root]))]
+        while stack:
+            v, it = stack[-1]
+            for w in it:
+                if cells[w] == 0:
+                    continue
+                if w not in disc:
+                    disc[w] = low[w] = time
+                    time += 1
+                    stack.append((w, iter(neighbours[w])))
+                    break
+                low[v] = min(low[v], disc[w])
+            else:
+                stack.pop()
+                if not stack:
+                    continue
+                parent = stack[-1][0]
+                low[parent] = min(low[parent], low[v])
+                if parent == root:
+                    root_children += 1
+                elif low[v] >= disc[parent]:
+                    points.add(parent)
+        if root_children > 1:
+            points.add(root)
+    return points
+
 def tester():
         """
         Within this file, define a test function named tester() to validate your
@@ -173,6 +836,53 @@ def tester():
             [1, 0, 1]
         ]
         print(State(test_grid).numHingers())
+
+        print("\nCompact state A:")
+        ca = CompactState(sa_grid)
+        print(ca)
+        print("Same regions and hingers as State A:",
+              ca.numRegions() == sa.numRegions() and ca.numHingers() == sa.numHingers())
+        print("Same moves as State A:",
+              [(s.grid, pos, cost) for s, pos, cost in ca.moves()] ==
+              [(s.grid, pos, cost) for s, pos, cost in sa.moves()])
+        print("Hashable:", len({ca, ca.clone(), CompactState(sa_grid)}) == 1)
+
+        print("\nHinger cells of the 3x3 test grid:", sorted(State(test_grid).hingerCells()))
+
+        print("\nApply and undo on State A:")
+        sa.apply(0, 1)
+        sa.apply(2, 2)
+        print(sa)
+        sa.undo()
+        sa.undo()
+        print("Restored:", sa.grid == sa_grid and sa.history == [])
+        print("Zobrist hash matches a fresh state:", sa.zobrist == State(sa_grid).zobrist)
+        print("Child hashes updated:", all(s.zobrist == State(s.grid).zobrist for s, _, _ in sa.moves()))
+
+        print("\nSymmetries of a square board:")
+        square = State([[1, 1, 0], [0, 1, 0], [0, 0, 0]])
+        flipped = State([[0, 0, 0], [0, 1, 0], [1, 1, 0]])   # square flipped top to bottom
+        key, transform = square.canonical()
+        print("Same canonical key:", key == flipped.canonical()[0])
+        print("Transform to canonical form:", SYMMETRIES[transform])
+        print("Move (0, 0) maps back:", square.unmapMove(square.mapMove((0, 0), transform), transform) == (0, 0))
+        print("Symmetries on State A:", [SYMMETRIES[t] for t in sa.symmetries()])
+
+        print("\nTracked state A:")
+        ta = TrackedState(sa_grid)
+        ta.apply(1, 2)
+        print(ta)
+        print("Regions:", ta.numRegions(), "Hingers:", sorted(ta.hingerCells()))
+        ta.undo()
+        print("Matches State A after undo:",
+              ta.numRegions() == sa.numRegions() and ta.hingerCells() == sa.hingerCells())
+
+        print("\nMoves in the first region only:")
+        split = State([[1, 1, 0, 2], [0, 0, 0, 1]])
+        print(split)
+        print("All moves:", [pos for pos, _ in split.legalMoves()])
+        print("Focus region:", [pos for pos, _ in split.legalMoves(reduce=True)])
+        print("Same on a tracked state:", TrackedState(split.grid).focusRegion() == split.focusRegion())
         
     
 if __name__ == "__main__":
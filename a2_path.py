@@ -19,7 +19,16 @@ This module implements the following algorithms:
   - min_safe
 """
 
-from a1_state import State
+import heapq
+import json
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
+from itertools import count
+
+from a1_state import State, neighbour_table
 """
 Helper functions
 """
@@ -27,20 +36,341 @@ def GridToKey(grid):
     """
     Converts a 2D grid into a tuple of tuples so it can be hashed/compared.
     Useful for storing visited states in sets/dictionaries.
+    The searches key on state.key() (the Zobrist hash) instead; this is only
+    needed for a snapshot of a state that is changed in place afterwards.
     """
     return tuple(tuple(row) for row in grid)
 
 
 def StatesEqual(s1, s2):
     """Returns True if two states have identical grids, if so that goal state
-    has been reached.
+    has been reached. Different Zobrist hashes rule this out without
+    comparing the grids.
     """
-    return s1.grid == s2.grid
+    return s1.zobrist == s2.zobrist and s1.grid == s2.grid
+
+
+class SafetyCache:
+    """
+    Bounded memo of hinger counts, shared by every search in the process.
+    The same boards come up again and again (across the algorithms in
+    compare(), and on every depth of IDDFS), so each board's hinger count
+    is worked out once. Entries are keyed on the board size and a tuple of
+    the counters, so a key never changes when a state is changed in place.
+    At most maxsize boards are kept, dropping the least recently used one
+    first; maxsize=0 turns caching off. Searches in several threads can
+    share one cache: the entries are only touched while holding a lock
+    (the hinger count itself is worked out outside it). Besides the totals
+    in hits and misses, each thread's own lookups are counted separately
+    (thread_counts()), so a search's stats are not mixed up with those of
+    searches running in other threads.
+    """
+    def __init__(self, maxsize=200000):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def numHingers(self, state):
+        """Returns state.numHingers(), from the cache if it has been seen before."""
+        Key = (state.rows, state.cols, tuple(state.grid_cells()))
+        Entries = self.entries
+        with self.lock:
+            Hingers = Entries.get(Key)
+            Local = self.local
+            if Hingers is not None:
+                self.hits += 1
+                Local.hits = getattr(Local, "hits", 0) + 1
+                Entries.move_to_end(Key)
+                return Hingers
+            self.misses += 1
+            Local.misses = getattr(Local, "misses", 0) + 1
+        Hingers = state.numHingers()
+        if self.maxsize > 0:
+            with self.lock:
+                Entries[Key] = Hingers
+                if len(Entries) > self.maxsize:
+                    Entries.popitem(last=False)
+        return Hingers
+
+    def resize(self, maxsize):
+        """Changes the cap, dropping the oldest entries if there are too many."""
+        with self.lock:
+            self.maxsize = maxsize
+            while len(self.entries) > max(maxsize, 0):
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Forgets every entry and resets the hit and miss counters. The
+        per-thread counts are left alone, as searches still running take
+        differences of them.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def thread_counts(self):
+        """Returns the hits and misses of the lookups made by the calling thread."""
+        Local = self.local
+        return getattr(Local, "hits", 0), getattr(Local, "misses", 0)
+
+    def info(self):
+        """Returns the hit and miss counts and the current and maximum size."""
+        return {"hits": self.hits, "misses": self.misses,
+                "size": len(self.entries), "maxsize": self.maxsize}
+
+
+SAFETY_CACHE = SafetyCache()
+# Caches set up by SafetyScope, per thread.
+_SCOPED_CACHE = threading.local()
+
+
+def ActiveSafetyCache():
+    """Returns the cache IsSafe uses in this thread: its SafetyScope's, or SAFETY_CACHE."""
+    return getattr(_SCOPED_CACHE, "cache", None) or SAFETY_CACHE
+
+
+@contextmanager
+def SafetyScope(maxsize=None):
+    """
+    Runs a block of searches with a fresh safety cache (of the same cap as
+    the shared one unless maxsize is given), and puts the outer cache back
+    afterwards. Yields the new cache so its counters can be read. Only the
+    calling thread's searches use the new cache; other threads keep theirs.
+    """
+    Outer = getattr(_SCOPED_CACHE, "cache", None)
+    Cache = SafetyCache(SAFETY_CACHE.maxsize if maxsize is None else maxsize)
+    _SCOPED_CACHE.cache = Cache
+    try:
+        yield Cache
+    finally:
+        _SCOPED_CACHE.cache = Outer
 
 
 def IsSafe(state):
     """Returns True if a state is safe (state has no hingers)."""
-    return state.numHingers() == 0
+    return ActiveSafetyCache().numHingers(state) == 0
+
+
+class SearchStopped(Exception):
+    """Raised inside a search by SearchControl.expand() when it has to stop."""
+
+
+class SearchControl:
+    """
+    Budgets and cancellation for a search. Any of the five searches takes
+    one as Control=SearchControl(...), and stops once it has run for
+    TimeLimit seconds, expanded NodeLimit states, or holds more than
+    StateLimit states (its memory budget), or once cancel() is called,
+    which can be done from another thread. A stopped search returns None.
+    Afterwards reason says why the search finished (FOUND, NO_PATH, TIME,
+    NODES, MEMORY, CANCELLED, or LIMIT if it used up its own step limit or
+    MaxDepth before proving there is no path), and best holds the path found, or else the
+    partial path to the state nearest to end (fewest counters still to
+    remove) that was reached, as an anytime answer.
+    Every search started with the control gets fresh budgets, but once
+    cancelled it stays cancelled.
+    """
+    FOUND = "found"
+    NO_PATH = "no path"
+    TIME = "time"
+    NODES = "nodes"
+    MEMORY = "memory"
+    CANCELLED = "cancelled"
+    LIMIT = "limit"
+
+    def __init__(self, TimeLimit=None, NodeLimit=None, StateLimit=None):
+        self.time_limit = TimeLimit
+        self.node_limit = NodeLimit
+        self.state_limit = StateLimit
+        self.cancelled = threading.Event()
+        self.deadline = None
+        self.nodes = 0
+        self.reason = None
+        self.best = None
+        self.target = 0
+        self.nearest = float('inf')
+
+    def cancel(self):
+        """Asks the search to stop at its next expansion."""
+        self.cancelled.set()
+
+    def begin(self, end):
+        """Starts the budgets for a search towards end."""
+        self.deadline = None if self.time_limit is None else time.monotonic() + self.time_limit
+        self.nodes = 0
+        self.reason = None
+        self.best = None
+        self.target = sum(end.grid_cells())
+        self.nearest = float('inf')
+
+    def expand(self, state, Moves, Stored):
+        """
+        Called by a search for every state it expands, with the moves that
+        led there (a list, a function returning one, or None if they are
+        not known) and the number of states it currently holds. Raises
+        SearchStopped once a budget runs out or the search is cancelled.
+        """
+        self.nodes += 1
+        if Moves is not None:
+            Left = sum(state.grid_cells()) - self.target
+            if Left < self.nearest:
+                self.nearest = Left
+                self.best = Moves() if callable(Moves) else list(Moves)
+        if self.cancelled.is_set():
+            self.reason = self.CANCELLED
+        elif self.node_limit is not None and self.nodes > self.node_limit:
+            self.reason = self.NODES
+        elif self.state_limit is not None and Stored > self.state_limit:
+            self.reason = self.MEMORY
+        elif self.deadline is not None and time.monotonic() > self.deadline:
+            self.reason = self.TIME
+        else:
+            return
+        raise SearchStopped(self.reason)
+
+    def limit(self):
+        """Called by a search that has used up its own step or depth limit."""
+        self.reason = self.LIMIT
+        raise SearchStopped(self.reason)
+
+    def finish(self, Result):
+        """Records how the search finished and passes its result on."""
+        if Result is not None:
+            self.reason = self.FOUND
+            self.best = list(Result)
+        elif self.reason is None:
+            self.reason = self.NO_PATH
+        return Result
+
+
+class SearchStats:
+    """
+    Counters a search fills in when it is given Stats=SearchStats(); with
+    no Stats a search counts nothing. After the search:
+      expanded       states whose moves were generated
+      generated      successor states (or moves) produced
+      duplicates     successors dropped because they had already been seen
+      safety_checks  calls to IsSafe, of which cache_hits were answered by
+                     the safety cache
+      peak_frontier  largest frontier (queue, heap, stack or path) size
+      phases         seconds spent in each phase of the search, e.g. per
+                     IDDFS depth or IDA* pass, and in total
+    """
+    def __init__(self):
+        self.expanded = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.safety_checks = 0
+        self.cache_hits = 0
+        self.peak_frontier = 0
+        self.phases = {}
+
+    def expand(self, Frontier):
+        """Counts an expansion, with the current size of the frontier."""
+        self.expanded += 1
+        if Frontier > self.peak_frontier:
+            self.peak_frontier = Frontier
+
+    def children(self, Moves):
+        """Passes on the successors from a move generator, counting them."""
+        for Move in Moves:
+            self.generated += 1
+            yield Move
+
+    def add_time(self, Name, Seconds):
+        self.phases[Name] = self.phases.get(Name, 0.0) + Seconds
+
+    def as_dict(self):
+        """Returns the counters as a plain dict, e.g. for json.dumps()."""
+        return {"expanded": self.expanded, "generated": self.generated,
+                "duplicates": self.duplicates, "safety_checks": self.safety_checks,
+                "cache_hits": self.cache_hits, "peak_frontier": self.peak_frontier,
+                "phases": dict(self.phases)}
+
+
+def Counted(Moves, Stats):
+    """Returns a move generator, counted by Stats if there is one."""
+    return Moves if Stats is None else Stats.children(Moves)
+
+
+@contextmanager
+def Phase(Stats, Name):
+    """Adds the time spent in the block to Stats.phases[Name], if there is a Stats."""
+    if Stats is None:
+        yield
+        return
+    Start = time.perf_counter()
+    try:
+        yield
+    finally:
+        Stats.add_time(Name, time.perf_counter() - Start)
+
+
+def Controlled(Search):
+    """
+    Lets a search take Control=SearchControl(...) and Stats=SearchStats().
+    The budgets are started before it runs, and a search that is stopped
+    part way returns None. The safety checks and total time are counted
+    here, from the lookups this thread made in the safety cache, and the
+    rest by the search itself.
+    """
+    @wraps(Search)
+    def Run(start, end, *args, Control=None, Stats=None, **kwargs):
+        if Control is None and Stats is None:
+            return Search(start, end, *args, **kwargs)
+        if Control is not None:
+            Control.begin(end)
+        if Stats is not None:
+            Cache = ActiveSafetyCache()
+            Hits, Misses = Cache.thread_counts()
+        with Phase(Stats, "total"):
+            try:
+                Result = Search(start, end, *args, Control=Control, Stats=Stats, **kwargs)
+            except SearchStopped:
+                Result = None
+        if Stats is not None:
+            NewHits, NewMisses = Cache.thread_counts()
+            Stats.cache_hits += NewHits - Hits
+            Stats.safety_checks += NewHits - Hits + NewMisses - Misses
+        return Result if Control is None else Control.finish(Result)
+    return Run
+
+
+def KeyFunction(end, Symmetric=False):
+    """
+    Returns the function the searches use to key their visited sets.
+    Normally that is state.key(). With Symmetric=True, states that are
+    rotations or reflections of each other share one key, using only the
+    symmetries that leave end unchanged: a path from a state to end then
+    maps onto a path of the same cost from its mirror image, so only one of
+    them needs to be searched.
+    """
+    if Symmetric:
+        Transforms = end.fixedSymmetries()
+        if len(Transforms) > 1:
+            return lambda state: state.canonical(Transforms)[0]
+    return lambda state: state.key()
+
+
+def Reachable(start, end):
+    """
+    Returns False if end can never be reached from start because some cell
+    of start already has fewer counters than end (moves only remove them).
+    Checked before every search, which then only expands moves on cells
+    with counters to spare (state.moves(end)).
+    Every search also takes Reduce=True, which expands only the moves in
+    one region at a time (state.focusRegion(end)) instead of every
+    interleaving of moves in different regions; the paths and costs found
+    are the same.
+    """
+    return (start.rows, start.cols) == (end.rows, end.cols) and all(
+        Have >= Want for Have, Want in zip(start.grid_cells(), end.grid_cells())
+    )
 
 
 def ApplyMoves(start, moves):
@@ -63,6 +393,20 @@ def MoveCost(state, move):
     return state.move_cost(r, c)
 
 
+def RebuildPath(Parent, Key):
+    """
+    Follows parent pointers back from Key to the start and returns the moves
+    in order. Parent maps each key to (parent key, move), or None for the
+    start state.
+    """
+    Moves = []
+    while Parent[Key] is not None:
+        Key, Move = Parent[Key]
+        Moves.append(Move)
+    Moves.reverse()
+    return Moves
+
+
 def PathCost(start, moves):
     """Finds out the total cost of a path."""
     Total = 0
@@ -86,20 +430,30 @@ BFS guarantees finding a path if one exists.
 BFS finds the shortest path.
 Simple to implement and understand.
 """
-def path_BFS(start, end):
-    if not IsSafe(start) or not IsSafe(end):
+@Controlled
+def path_BFS(start, end, Symmetric=False, Bidirectional=False, Reduce=False, Control=None, Stats=None):
+    if not IsSafe(start) or not IsSafe(end) or not Reachable(start, end):
         return None
     if StatesEqual(start, end):
         return []
+    if Bidirectional:
+        return bidirectional_bfs(start, end, Reduce, Control, Stats)
 
+    KeyOf = KeyFunction(end, Symmetric)
     Frontier = [(start, [])]
-    Visited = {GridToKey(start.grid)}
+    Visited = {KeyOf(start)}
 
     while Frontier:
         Current, Moves = Frontier.pop(0)
-        for NextState, pos, cost in Current.moves():
-            Key = GridToKey(NextState.grid)
+        if Control is not None:
+            Control.expand(Current, Moves, len(Visited))
+        if Stats is not None:
+            Stats.expand(len(Frontier) + 1)
+        for NextState, pos, cost in Counted(Current.moves(end, Reduce), Stats):
+            Key = KeyOf(NextState)
             if Key in Visited:
+                if Stats is not None:
+                    Stats.duplicates += 1
                 continue
             if not IsSafe(NextState):
                 continue
@@ -110,6 +464,81 @@ def path_BFS(start, end):
             Frontier.append((NextState, NewMoves))
     return None
 
+def bidirectional_bfs(start, end, Reduce=False, Control=None, Stats=None):
+    """
+    BFS from both ends at once for path_BFS. The forward side removes
+    counters from start, the backward side puts counters back on end (on
+    cells that have fewer than in start), and both only keep safe states.
+    Each round grows whichever frontier is smaller by one level, and the
+    search stops as soon as a state is reached from both sides. Every path
+    from start to end has the same number of moves, so the joined path is
+    a shortest one. Visited states are keyed on state.key(); symmetric
+    keys are not used here, because the two halves would not join up.
+    Reduce only applies to the forward side.
+    """
+    Forward = {start.key(): None}   # key -> (parent key, move from the parent)
+    Backward = {end.key(): None}    # key -> (child key, move to the child)
+    ForwardFrontier = [start]
+    BackwardFrontier = [end]
+
+    while ForwardFrontier and BackwardFrontier:
+        Size = len(ForwardFrontier) + len(BackwardFrontier)
+        if len(ForwardFrontier) <= len(BackwardFrontier):
+            NewFrontier = []
+            with Phase(Stats, "forward"):
+                for Current in ForwardFrontier:
+                    if Control is not None:
+                        Control.expand(Current, lambda: RebuildPath(Forward, Current.key()), len(Forward) + len(Backward))
+                    if Stats is not None:
+                        Stats.expand(Size)
+                    for NextState, pos, cost in Counted(Current.moves(end, Reduce), Stats):
+                        Key = NextState.key()
+                        if Key in Forward:
+                            if Stats is not None:
+                                Stats.duplicates += 1
+                            continue
+                        if not IsSafe(NextState):
+                            continue
+                        Forward[Key] = (Current.key(), pos)
+                        if Key in Backward:
+                            return JoinPaths(Forward, Backward, Key)
+                        NewFrontier.append(NextState)
+            ForwardFrontier = NewFrontier
+        else:
+            NewFrontier = []
+            with Phase(Stats, "backward"):
+                for Current in BackwardFrontier:
+                    if Control is not None:
+                        Control.expand(Current, None, len(Forward) + len(Backward))
+                    if Stats is not None:
+                        Stats.expand(Size)
+                    for PrevState, pos, cost in Counted(Current.predecessors(start), Stats):
+                        Key = PrevState.key()
+                        if Key in Backward:
+                            if Stats is not None:
+                                Stats.duplicates += 1
+                            continue
+                        if not IsSafe(PrevState):
+                            continue
+                        Backward[Key] = (Current.key(), pos)
+                        if Key in Forward:
+                            return JoinPaths(Forward, Backward, Key)
+                        NewFrontier.append(PrevState)
+            BackwardFrontier = NewFrontier
+    return None
+
+
+def JoinPaths(Forward, Backward, Key):
+    """
+    Joins the two halves of a bidirectional search that met at Key: the
+    moves from start to Key, then the moves from Key on to end.
+    """
+    Moves = RebuildPath(Forward, Key)
+    while Backward[Key] is not None:
+        Key, Move = Backward[Key]
+        Moves.append(Move)
+    return Moves
+
 """
 b. A function path_DFS(start, end) which receives two binary states, start and
 end, and returns a safe path (as a list of moves) if such a path exists, or None
@@ -120,24 +549,35 @@ Uses a stack to explore as deep as possible along each path before backtracking.
 DFS can be more memory efficient than BFS for deep search spaces.
 DFS can find a path quickly in some scenarios, though not guaranteed to be shortest.
 """
-def path_DFS(start, end, limit=10000):
-    if not IsSafe(start) or not IsSafe(end):
+@Controlled
+def path_DFS(start, end, limit=10000, InPlace=False, Reduce=False, Control=None, Stats=None):
+    if not IsSafe(start) or not IsSafe(end) or not Reachable(start, end):
         return None
     if StatesEqual(start, end):
         return []
+    if InPlace:
+        return dfs_inplace(start, end, limit, Reduce, Control, Stats)
 
     Stack = [(start, [])]
-    Visited = {GridToKey(start.grid)}
+    Visited = {start.key()}
 
     Steps = 0
     while Stack:
         Current, Moves = Stack.pop()
         Steps += 1
         if Steps > limit:
+            if Control is not None:
+                Control.limit()
             return None
-        for NextState, pos, cost in Current.moves():
-            Key = GridToKey(NextState.grid)
+        if Control is not None:
+            Control.expand(Current, Moves, len(Visited))
+        if Stats is not None:
+            Stats.expand(len(Stack) + 1)
+        for NextState, pos, cost in Counted(Current.moves(end, Reduce), Stats):
+            Key = NextState.key()
             if Key in Visited:
+                if Stats is not None:
+                    Stats.duplicates += 1
                 continue
             if not IsSafe(NextState):
                 continue
@@ -149,23 +589,144 @@ def path_DFS(start, end, limit=10000):
     return None
 
 
-def limited_dfs(Current, end, depth, Visited, Moves):
+def dfs_inplace(start, end, limit, Reduce=False, Control=None, Stats=None):
+    """
+    Zero-allocation version of path_DFS. Walks the tree on a single copy of
+    start with apply()/undo(), keeping one move generator per level instead
+    of a State per frontier entry. The path found may differ from path_DFS,
+    which expands every child of a node before going deeper.
+    """
+    Current = State(start.grid)
+    Visited = {GridToKey(Current.grid)}
+    Moves = []
+    Stack = [Counted(Current.legalMoves(end, Reduce), Stats)]
+
+    Steps = 1
+    while Stack:
+        for pos, cost in Stack[-1]:
+            Current.apply(*pos)
+            Key = GridToKey(Current.grid)
+            if Key in Visited:
+                if Stats is not None:
+                    Stats.duplicates += 1
+                Current.undo()
+                continue
+            if not IsSafe(Current):
+                Current.undo()
+                continue
+            Visited.add(Key)
+            Moves.append(pos)
+            if StatesEqual(Current, end):
+                return Moves
+            Steps += 1
+            if Steps > limit:
+                if Control is not None:
+                    Control.limit()
+                return None
+            if Control is not None:
+                Control.expand(Current, Moves, len(Visited))
+            if Stats is not None:
+                Stats.expand(len(Stack) + 1)
+            Stack.append(Counted(Current.legalMoves(end, Reduce), Stats))
+            break
+        else:
+            Stack.pop()
+            if Moves:
+                Moves.pop()
+                Current.undo()
+    return None
+
+
+def limited_dfs(Current, end, depth, Visited, Moves, Reduce=False, Control=None, Stats=None):
     """Building block for IDDFS, allows IDDFS to explore shallower depths first."""
     if StatesEqual(Current, end):
         return Moves
     if depth == 0:
         return None
-    for NextState, pos, cost in Current.moves():
-        Key = GridToKey(NextState.grid)
-        if Key in Visited or not IsSafe(NextState):
+    if Control is not None:
+        Control.expand(Current, Moves, len(Visited))
+    if Stats is not None:
+        Stats.expand(len(Moves) + 1)
+    for NextState, pos, cost in Counted(Current.moves(end, Reduce), Stats):
+        Key = NextState.key()
+        if Key in Visited:
+            if Stats is not None:
+                Stats.duplicates += 1
+            continue
+        if not IsSafe(NextState):
             continue
         Visited.add(Key)
-        Result = limited_dfs(NextState, end, depth - 1, Visited, Moves + [pos])
+        Result = limited_dfs(NextState, end, depth - 1, Visited, Moves + [pos], Reduce, Control, Stats)
         Visited.remove(Key)
         if Result is not None:
             return Result
     return None
 
+def limited_dfs_inplace(Current, end, depth, Moves, Reduce=False, Control=None, Stats=None):
+    """
+    Zero-allocation version of limited_dfs. Current is changed with apply()
+    and put back with undo(), and Moves is a single list pushed and popped
+    along the way. No Visited set is needed: every move removes a counter,
+    so a path can never come back to a state it has already been through.
+    """
+    if StatesEqual(Current, end):
+        return True
+    if depth == 0:
+        return False
+    if Control is not None:
+        Control.expand(Current, Moves, len(Moves))
+    if Stats is not None:
+        Stats.expand(len(Moves) + 1)
+    for pos, cost in Counted(Current.legalMoves(end, Reduce), Stats):
+        Current.apply(*pos)
+        if IsSafe(Current):
+            Moves.append(pos)
+            if limited_dfs_inplace(Current, end, depth - 1, Moves, Reduce, Control, Stats):
+                Current.undo()
+                return True
+            Moves.pop()
+        Current.undo()
+    return False
+
+def limited_dfs_table(Current, end, depth, Needed, Moves, Failed, TableSize, Reduce=False, Control=None, Stats=None):
+    """
+    limited_dfs_inplace with a transposition table, used by path_IDDFS.
+    Failed maps each board (as a tuple of counters) that has been searched
+    without reaching end to the depth it was searched with, and the board
+    is skipped whenever it comes up again with no more depth than that,
+    whichever path led to it and on whichever iteration. Needed is the
+    number of counters still to remove: every path to end has exactly that
+    many moves, so less depth can never reach end and more depth makes no
+    difference. At most TableSize boards are kept, dropping the oldest.
+    """
+    if StatesEqual(Current, end):
+        return True
+    if depth < Needed:
+        return False
+    depth = Needed
+    Key = tuple(Current.grid_cells())
+    if Failed.get(Key, -1) >= depth:
+        if Stats is not None:
+            Stats.duplicates += 1
+        return False
+    if Control is not None:
+        Control.expand(Current, Moves, len(Failed))
+    if Stats is not None:
+        Stats.expand(len(Moves) + 1)
+    for pos, cost in Counted(Current.legalMoves(end, Reduce), Stats):
+        Current.apply(*pos)
+        if IsSafe(Current):
+            Moves.append(pos)
+            if limited_dfs_table(Current, end, depth - 1, Needed - 1, Moves, Failed, TableSize, Reduce, Control, Stats):
+                Current.undo()
+                return True
+            Moves.pop()
+        Current.undo()
+    if Key not in Failed and len(Failed) >= TableSize:
+        del Failed[next(iter(Failed))]
+    Failed[Key] = depth
+    return False
+
 """
 c. A function path_
 IDDFS(start, end) which receives two binary states, start and
@@ -175,18 +736,61 @@ otherwise, using the Iterative Deepening Depth-First Search (IDDFS).
 Justification for IDDFS:
 Combines benefits of BFS (completeness) and DFS (space efficiency).
 Explores shallower depths first, which can find solutions quickly in some cases.
+By default it keeps a table of up to TableSize boards that have already failed
+(see limited_dfs_table), which always works in place on a single State. InPlace
+only picks the table-free in-place search, so it only applies with TableSize=0.
 """
-def path_IDDFS(start, end, MaxDepth=50):
-    if not IsSafe(start) or not IsSafe(end):
+@Controlled
+def path_IDDFS(start, end, MaxDepth=50, InPlace=False, Reduce=False, TableSize=100000, Control=None, Stats=None):
+    if not IsSafe(start) or not IsSafe(end) or not Reachable(start, end):
         return None
     if StatesEqual(start, end):
         return []
 
+    # Every path to end has exactly Needed moves, so failing at a MaxDepth
+    # below that proves nothing and is reported to Control as a limit.
+    Needed = sum(start.grid_cells()) - sum(end.grid_cells())
+
+    # With a table (TableSize > 0), boards that have already failed are not
+    # searched again, within an iteration or on a later one, and the moves
+    # are kept on one shared stack. The path found is the same as without.
+    if TableSize > 0:
+        Current = State(start.grid)
+        Failed = {}
+        for depth in range(1, MaxDepth + 1):
+            Moves = []
+            with Phase(Stats, f"depth {depth}"):
+                Found = limited_dfs_table(Current, end, depth, Needed, Moves, Failed, TableSize, Reduce, Control, Stats)
+            if Found:
+                return Moves
+        return DepthLimited(MaxDepth, Needed, Control)
+
+    if InPlace:
+        Current = State(start.grid)
+        for depth in range(1, MaxDepth + 1):
+            Moves = []
+            with Phase(Stats, f"depth {depth}"):
+                Found = limited_dfs_inplace(Current, end, depth, Moves, Reduce, Control, Stats)
+            if Found:
+                return Moves
+        return DepthLimited(MaxDepth, Needed, Control)
+
     for depth in range(1, MaxDepth + 1):
-        Visited = {GridToKey(start.grid)}
-        Result = limited_dfs(start, end, depth, Visited, [])
+        Visited = {start.key()}
+        with Phase(Stats, f"depth {depth}"):
+            Result = limited_dfs(start, end, depth, Visited, [], Reduce, Control, Stats)
         if Result is not None:
             return Result
+    return DepthLimited(MaxDepth, Needed, Control)
+
+
+def DepthLimited(MaxDepth, Needed, Control):
+    """
+    Ends an IDDFS that found no path: if MaxDepth was too shallow for the
+    Needed moves, Control (if any) is told the depth limit was hit.
+    """
+    if Control is not None and MaxDepth < Needed:
+        Control.limit()
     return None
 
 
@@ -219,6 +823,24 @@ def manhattan_heuristic(start, end):
     Total += abs(len(S1) - len(S2))
     return Total
 
+def surplus_heuristic(state, end):
+    """
+    Admissible and consistent estimate of the cost still needed to turn
+    state into end, for min_safe. Every surplus counter on a cell must still
+    be removed, and that move costs at least 1 plus the neighbours that are
+    still active in end (they can never be emptied on the way). Returns
+    infinity if a cell already has fewer counters than end needs.
+    """
+    Total = 0
+    EndCells = end.grid_cells()
+    Indices = neighbour_table(state.rows, state.cols).indices
+    for i, (Have, Want) in enumerate(zip(state.grid_cells(), EndCells)):
+        if Have < Want:
+            return float('inf')
+        if Have > Want:
+            Total += (Have - Want) * (1 + sum(1 for j in Indices[i] if EndCells[j] > 0))
+    return Total
+
 """
 d. A function path_astar(start,end) which receives two binary states, start and
 end, and returns a safe path if one exists, or None otherwise, using the A*
@@ -230,57 +852,55 @@ Explores paths with the lowest estimated total cost first.
 Faster on larger boards.
 Combines benefits of uniform cost search (optimality) with heuristics (speed).
 """
-def path_astar(start, end):
-    if not IsSafe(start) or not IsSafe(end):
+@Controlled
+def path_astar(start, end, Reduce=False, Control=None, Stats=None):
+    if not IsSafe(start) or not IsSafe(end) or not Reachable(start, end):
         return None
     if StatesEqual(start, end):
         return []
 
-    OpenList = [start]
-    CameFrom = {}
-    MoveTo = {}
-    g = {GridToKey(start.grid): 0}
-    f = {GridToKey(start.grid): manhattan_heuristic(start, end)}
+    # Open list is a binary heap of (f, -g, tie, state, key). Entries are
+    # never removed when a state gets a better g; the old entry is skipped
+    # when it comes off the heap (lazy deletion). Ties on f go to the larger
+    # g, i.e. the node closer to the goal. g doubles as the open-set index.
+    StartKey = start.key()
+    g = {StartKey: 0}
+    Parent = {StartKey: None}
+    Tie = count()
+    OpenList = [(manhattan_heuristic(start, end), 0, next(Tie), start, StartKey)]
     Closed = set()
 
     while OpenList:
-        Current = OpenList[0]
-        BestF = f[GridToKey(Current.grid)]
-        for s in OpenList:
-            Key = GridToKey(s.grid)
-            if f[Key] < BestF:
-                Current = s
-                BestF = f[Key]
+        _, NegG, _, Current, CurrentKey = heapq.heappop(OpenList)
+        if CurrentKey in Closed or -NegG > g[CurrentKey]:
+            continue   # stale entry
 
-        OpenList.remove(Current)
-        Closed.add(GridToKey(Current.grid))
+        Closed.add(CurrentKey)
 
         if StatesEqual(Current, end):
-            Moves = []
-            Key = GridToKey(Current.grid)
-            while Key in CameFrom:
-                Moves.insert(0, MoveTo[Key])
-                Key = CameFrom[Key]
-            return Moves
-
-        for NextState, pos, cost in Current.moves():
-            KeyNext = GridToKey(NextState.grid)
-            if KeyNext in Closed or not IsSafe(NextState):
+            return RebuildPath(Parent, CurrentKey)
+        if Control is not None:
+            Control.expand(Current, lambda: RebuildPath(Parent, CurrentKey), len(g))
+        if Stats is not None:
+            Stats.expand(len(OpenList) + 1)
+
+        for NextState, pos, cost in Counted(Current.moves(end, Reduce), Stats):
+            KeyNext = NextState.key()
+            if KeyNext in Closed:
+                if Stats is not None:
+                    Stats.duplicates += 1
+                continue
+            if not IsSafe(NextState):
                 continue
 
-            gNew = g[GridToKey(Current.grid)] + cost
+            gNew = g[CurrentKey] + cost
             if (KeyNext not in g) or (gNew < g[KeyNext]):
-                CameFrom[KeyNext] = GridToKey(Current.grid)
-                MoveTo[KeyNext] = pos
+                Parent[KeyNext] = (CurrentKey, pos)
                 g[KeyNext] = gNew
-                f[KeyNext] = gNew + manhattan_heuristic(NextState, end)
-                InOpen = False
-                for s in OpenList:
-                    if GridToKey(s.grid) == KeyNext:
-                        InOpen = True
-                        break
-                if not InOpen:
-                    OpenList.append(NextState)
+                fNew = gNew + manhattan_heuristic(NextState, end)
+                heapq.heappush(OpenList, (fNew, -gNew, next(Tie), NextState, KeyNext))
+            elif Stats is not None:
+                Stats.duplicates += 1
     return None
 
 """
@@ -293,56 +913,355 @@ Justification for Uniform Cost Search:
 Expands lowest cost path first.
 Doesn't need a heuristic like A* (hard to make one for non-binary states).
 Works for any number of counters per cell.
+An admissible heuristic can still be passed in (e.g. surplus_heuristic),
+which turns it into A* and finds the same minimal cost with fewer expansions.
+With IDA=True it runs as IDA* instead (see ida_star), which needs memory
+only for the current path and a table of at most TableSize boards
+(TableSize=0 for none), for boards with too many states to store. IDA* works
+on one board changed in place, so it cannot share keys between mirror images:
+Symmetric=True together with IDA=True raises ValueError.
 """
 
-def min_safe(start, end):
-    if not IsSafe(start) or not IsSafe(end):
+@Controlled
+def min_safe(start, end, Symmetric=False, Heuristic=None, Reduce=False, IDA=False, TableSize=10000, Control=None, Stats=None):
+    if IDA and Symmetric:
+        raise ValueError("Symmetric is not supported with IDA=True")
+    if not IsSafe(start) or not IsSafe(end) or not Reachable(start, end):
         return None
 
     if StatesEqual(start, end):
         return []
 
-    Frontier = [(0, start, [])]
-    BestCost = {GridToKey(start.grid): 0}
+    if IDA:
+        return ida_star(start, end, Heuristic or surplus_heuristic, Reduce, TableSize, Control, Stats)
+
+    # Frontier is a heap of (cost + heuristic, tie, key, state); ties are
+    # taken in the order they were pushed. Each state keeps only a parent
+    # pointer, and the path is rebuilt once the goal is reached.
+    KeyOf = KeyFunction(end, Symmetric)
+    Estimate = (lambda state: 0) if Heuristic is None else (lambda state: Heuristic(state, end))
+    StartKey = KeyOf(start)
+    BestCost = {StartKey: 0}
+    Parent = {StartKey: None}
+    Tie = count()
+    Frontier = [(Estimate(start), next(Tie), StartKey, start)]
     Closed = set()
 
     while Frontier:
-        Frontier.sort(key=lambda x: x[0])
-        CurrentCost, Current, Moves = Frontier.pop(0)
-
-        CurrentKey = GridToKey(Current.grid)
+        _, _, CurrentKey, Current = heapq.heappop(Frontier)
 
         if CurrentKey in Closed:
             continue
 
         Closed.add(CurrentKey)
+        CurrentCost = BestCost[CurrentKey]
 
         if StatesEqual(Current, end):
-            return Moves
-
-        for NextState, pos, MoveCost in Current.moves():
-            NextKey = GridToKey(NextState.grid)
-
-            if not IsSafe(NextState) or NextKey in Closed:
+            return RebuildPath(Parent, CurrentKey)
+        if Control is not None:
+            Control.expand(Current, lambda: RebuildPath(Parent, CurrentKey), len(BestCost))
+        if Stats is not None:
+            Stats.expand(len(Frontier) + 1)
+
+        for NextState, pos, MoveCost in Counted(Current.moves(end, Reduce), Stats):
+            NextKey = KeyOf(NextState)
+
+            if NextKey in Closed:
+                if Stats is not None:
+                    Stats.duplicates += 1
+                continue
+            if not IsSafe(NextState):
                 continue
 
             NewCost = CurrentCost + MoveCost
 
             if NextKey not in BestCost or NewCost < BestCost[NextKey]:
+                Remaining = Estimate(NextState)
+                if Remaining == float('inf'):
+                    continue
                 BestCost[NextKey] = NewCost
-                NewMoves = Moves + [pos]
-                Frontier.append((NewCost, NextState, NewMoves))
+                Parent[NextKey] = (CurrentKey, pos)
+                heapq.heappush(Frontier, (NewCost + Remaining, next(Tie), NextKey, NextState))
+            elif Stats is not None:
+                Stats.duplicates += 1
 
     return None
 
+def ida_star(start, end, Heuristic, Reduce=False, TableSize=0, Control=None, Stats=None):
+    """
+    IDA* version of min_safe. Runs f-bounded depth-first passes on a single
+    working State, starting with the bound Heuristic(start, end) and raising
+    it to the smallest f that went over it each time. Only the current path
+    is stored, so memory grows with the number of moves, not the number of
+    states. With an admissible heuristic (surplus_heuristic by default) the
+    first path found has the minimal cost.
+    TableSize > 0 adds a table of what each failed board has shown about
+    its remaining cost, kept from one pass to the next, for at most
+    TableSize boards; once full, no new boards are added.
+    """
+    Current = State(start.grid)
+    Estimate = lambda state: Heuristic(state, end)
+    Learned = {}
+    Bound = Estimate(Current)
+    while Bound != float('inf'):
+        Moves = []
+        with Phase(Stats, f"bound {Bound}"):
+            Bound = ida_search(Current, end, 0, Bound, Estimate, Moves, Learned, TableSize, Reduce, Control, Stats)
+        if Bound is None:
+            return Moves
+    return None
+
+
+def ida_search(Current, end, g, Bound, Estimate, Moves, Learned, TableSize, Reduce=False, Control=None, Stats=None):
+    """
+    One pass of ida_star from Current, which has been reached with cost g.
+    Returns None once end is reached (Moves then holds the path), or else
+    the smallest f over Bound met on the way, infinity if there was none.
+    That smallest f, less g, is a lower bound on the cost from a board to
+    end, so it is kept in Learned and used in place of a lower estimate.
+    This also stops the pass searching a board again that it has already
+    searched from a lower g.
+    Like dfs_inplace, the pass keeps one move generator per ply on an
+    explicit stack, along with each ply's board key, g and smallest f so
+    far, so paths of any length stay within the recursion limit.
+    """
+    def Bounded(g):
+        """The board key and f of Current, reached with cost g."""
+        Key = tuple(Current.grid_cells()) if TableSize > 0 else None
+        h = Estimate(Current)
+        if Key is not None:
+            h = max(h, Learned.get(Key, 0))
+        return Key, g + h
+
+    def Expand(Key, g):
+        """Pushes a ply for Current, reached with cost g."""
+        if Control is not None:
+            Control.expand(Current, Moves, len(Learned) + len(Moves))
+        if Stats is not None:
+            Stats.expand(len(Moves) + 1)
+        Stack.append([Key, g, Counted(Current.legalMoves(end, Reduce), Stats), float('inf')])
+
+    Key, f = Bounded(g)
+    if f > Bound:
+        return f
+    if StatesEqual(Current, end):
+        return None
+    Stack = []
+    Expand(Key, g)
+    while Stack:
+        Ply = Stack[-1]
+        Key, g, Children, _ = Ply
+        for pos, cost in Children:
+            Current.apply(*pos)
+            if not IsSafe(Current):
+                Current.undo()
+                continue
+            NextKey, f = Bounded(g + cost)
+            if f > Bound:
+                Ply[3] = min(Ply[3], f)
+                Current.undo()
+                continue
+            Moves.append(pos)
+            if StatesEqual(Current, end):
+                for _ in Moves:
+                    Current.undo()
+                return None
+            Expand(NextKey, g + cost)
+            break
+        else:
+            Stack.pop()
+            NextBound = Ply[3]
+            if Key is not None and (Key in Learned or len(Learned) < TableSize):
+                Learned[Key] = NextBound - g
+            if not Stack:
+                return NextBound
+            Stack[-1][3] = min(Stack[-1][3], NextBound)
+            Moves.pop()
+            Current.undo()
+
+"""
+Streaming safe paths: safe_paths() yields the safe paths from start to end
+one at a time, cheapest first, so a caller can take the k cheapest (or walk
+through all of them) and stop whenever it likes.
+"""
+def safe_paths(start, end, k=None):
+    """
+    Generator that yields safe paths from start to end in order of
+    non-decreasing cost, at most k of them (all of them if k is None).
+    The exact cheapest cost from every state to end is worked out first
+    (moves only remove counters, so the states form a DAG and a memoised
+    post-order DFS is enough). A best-first search over partial paths ordered by
+    cost so far + that exact remaining cost then only ever extends
+    partial paths that can still reach end, and takes them off the heap
+    cheapest first. Partial paths share their common prefixes, so only
+    the heap and the per-state costs are held in memory, never the full
+    list of paths.
+    """
+    if not IsSafe(start) or not IsSafe(end) or not Reachable(start, end):
+        return
+
+    Remaining = {}   # key -> cheapest cost on to end (infinity if there is no safe path)
+
+    def CostToEnd(state, Key):
+        """
+        Fills in Remaining for state and every safe state below it, in
+        post-order on an explicit stack of [key, children, best so far, cost
+        of the move that led there], so long paths stay within the
+        recursion limit.
+        """
+        Stack = [[Key, state.moves(end), 0 if StatesEqual(state, end) else float('inf'), 0]]
+        while Stack:
+            Frame = Stack[-1]
+            for NextState, pos, cost in Frame[1]:
+                if not IsSafe(NextState):
+                    continue
+                NextKey = NextState.key()
+                if NextKey in Remaining:
+                    Frame[2] = min(Frame[2], cost + Remaining[NextKey])
+                    continue
+                Best = 0 if StatesEqual(NextState, end) else float('inf')
+                Stack.append([NextKey, NextState.moves(end), Best, cost])
+                break
+            else:
+                Stack.pop()
+                Remaining[Frame[0]] = Frame[2]
+                if Stack:
+                    Stack[-1][2] = min(Stack[-1][2], Frame[3] + Frame[2])
+        return Remaining[Key]
+
+    if CostToEnd(start, start.key()) == float('inf'):
+        return
+
+    # Heap of (cost so far + remaining cost, -cost so far, tie, state, path),
+    # where a path is a linked list (last move, rest of the path). Ties go
+    # to the partial path furthest along, so equally cheap paths are
+    # finished one by one rather than all grown side by side.
+    Tie = count()
+    Heap = [(Remaining[start.key()], 0, next(Tie), start, None)]
+    Found = 0
+    while Heap and (k is None or Found < k):
+        _, NegG, _, Current, Path = heapq.heappop(Heap)
+        g = -NegG
+        if StatesEqual(Current, end):
+            Moves = []
+            while Path is not None:
+                Move, Path = Path
+                Moves.append(Move)
+            Moves.reverse()
+            Found += 1
+            yield Moves
+            continue
+        for NextState, pos, cost in Current.moves(end):
+            Estimate = Remaining.get(NextState.key(), float('inf'))   # unsafe states were never costed
+            if Estimate != float('inf'):
+                heapq.heappush(Heap, (g + cost + Estimate, -(g + cost), next(Tie), NextState, (pos, Path)))
+
+"""
+One-to-many queries: the safe paths from one start to each of several end
+states, from a single search tree instead of one search per end.
+"""
+def paths_from(start, ends, Cheapest=False):
+    """
+    Returns a list holding, for each state in ends, a safe path from start
+    (as path_BFS would find, or of minimal cost as min_safe would with
+    Cheapest=True), or None if there is none.
+    Only cells with more counters than the fewest any end has there are
+    moved on. The search stops once every end has been reached, or once
+    the states left have fewer counters than every end still waiting.
+    """
+    Results = [None] * len(ends)
+    Waiting = {}   # Zobrist hash -> [(index, end, counters)] for the ends not reached yet
+    Left = {}      # counters -> number of ends with that many still waiting
+    for i, end in enumerate(ends):
+        if IsSafe(end) and Reachable(start, end):
+            Counters = sum(end.grid_cells())
+            Waiting.setdefault(end.zobrist, []).append((i, end, Counters))
+            Left[Counters] = Left.get(Counters, 0) + 1
+    if not Waiting or not IsSafe(start):
+        return Results
+
+    Cells = [min(Column) for Column in zip(*(end.grid_cells() for Ends in Waiting.values() for _, end, _ in Ends))]
+    Floor = State([Cells[r*start.cols:(r + 1)*start.cols] for r in range(start.rows)])
+    Parent = {start.key(): None}
+    Levels = sorted(Left, reverse=True)   # the counts in Left, fewest last
+
+    def Lowest():
+        """Fewest counters on any end still waiting."""
+        while not Left[Levels[-1]]:
+            Levels.pop()
+        return Levels[-1]
+
+    def Settle(state, Key):
+        """Records the path to state for every waiting end it matches."""
+        Ends = Waiting.get(state.zobrist, ())
+        for Entry in [Entry for Entry in Ends if Entry[1].grid == state.grid]:
+            Results[Entry[0]] = RebuildPath(Parent, Key)
+            Left[Entry[2]] -= 1
+            Ends.remove(Entry)
+        if not Ends:
+            Waiting.pop(state.zobrist, None)
+
+    Settle(start, start.key())
+    Total = sum(start.grid_cells())
+
+    if not Cheapest:
+        # Each BFS level has one counter fewer, so an end with n counters
+        # can only be reached on the level with n counters left.
+        Frontier = [start]
+        while Frontier and Waiting and Total > Lowest():
+            Total -= 1
+            NewFrontier = []
+            for Current in Frontier:
+                CurrentKey = Current.key()
+                for NextState, pos, cost in Current.moves(Floor):
+                    Key = NextState.key()
+                    if Key in Parent or not IsSafe(NextState):
+                        continue
+                    Parent[Key] = (CurrentKey, pos)
+                    Settle(NextState, Key)
+                    NewFrontier.append(NextState)
+            Frontier = NewFrontier
+        return Results
+
+    # Dijkstra: an end's path is final once it comes off the heap.
+    StartKey = start.key()
+    BestCost = {StartKey: 0}
+    Tie = count()
+    Frontier = [(0, next(Tie), StartKey, start, Total)]
+    Closed = set()
+    while Frontier and Waiting:
+        CurrentCost, _, CurrentKey, Current, Total = heapq.heappop(Frontier)
+        if CurrentKey in Closed:
+            continue
+        Closed.add(CurrentKey)
+        Settle(Current, CurrentKey)
+        if not Waiting:
+            break
+        if Total <= Lowest():
+            continue   # no waiting end has fewer counters than this
+        for NextState, pos, MoveCost in Current.moves(Floor):
+            NextKey = NextState.key()
+            if NextKey in Closed or not IsSafe(NextState):
+                continue
+            NewCost = CurrentCost + MoveCost
+            if NextKey not in BestCost or NewCost < BestCost[NextKey]:
+                BestCost[NextKey] = NewCost
+                Parent[NextKey] = (CurrentKey, pos)
+                heapq.heappush(Frontier, (NewCost, next(Tie), NextKey, NextState, Total - 1))
+    return Results
+
 """
 f. A test function named tester() to test the functions you implemented.
 Function compare() to evaluate and compare the performance of the
 four search algorithms (BFS,DFS, IDDFS, and A*) in finding a safe path
 between two game states in Hinger.
 """
-def compare(start, end):
-    print("\nComparing search algorithms:\n")
+def compare(start, end, Format="table"):
+    """
+    Runs every search from start to end and reports the path length, cost
+    and search statistics of each, as a table (Format="table") or as JSON
+    (Format="json"). Returns the same results as a list of dicts.
+    """
     Algos = [
         ("BFS", path_BFS),
         ("DFS", path_DFS),
@@ -351,13 +1270,30 @@ def compare(start, end):
         ("MinSafe", min_safe)
     ]
 
+    Rows = []
     for name, func in Algos:
-        Moves = func(start, end)
-        if Moves is not None:
-            Cost = PathCost(start, Moves) if Moves else 0
-            print(f"{name:8} | Success | Path length: {len(Moves)} | Total cost: {Cost}")
-        else:
-            print(f"{name:8} | Failed to find a path.")
+        Stats = SearchStats()
+        Moves = func(start, end, Stats=Stats)
+        Row = {"algorithm": name, "found": Moves is not None,
+               "length": None if Moves is None else len(Moves),
+               "cost": None if Moves is None else PathCost(start, Moves)}
+        Row.update(Stats.as_dict())
+        Rows.append(Row)
+
+    if Format == "json":
+        print(json.dumps(Rows, indent=2))
+        return Rows
+
+    print("\nComparing search algorithms:\n")
+    print(f"{'Algorithm':9} | {'Result':7} | {'Length':>6} | {'Cost':>5} | {'Expanded':>8} | {'Generated':>9} | "
+          f"{'Dupes':>6} | {'Safety':>7} | {'Cache hits':>10} | {'Peak':>6} | {'ms':>8}")
+    for Row in Rows:
+        Length = "-" if Row["length"] is None else Row["length"]
+        Cost = "-" if Row["cost"] is None else Row["cost"]
+        print(f"{Row['algorithm']:9} | {'Success' if Row['found'] else 'Failed':7} | {Length:>6} | {Cost:>5} | "
+              f"{Row['expanded']:>8} | {Row['generated']:>9} | {Row['duplicates']:>6} | {Row['safety_checks']:>7} | "
+              f"{Row['cache_hits']:>10} | {Row['peak_frontier']:>6} | {Row['phases']['total'] * 1000:>8.2f}")
+    return Rows
 
 
 """
@@ -429,10 +1365,12 @@ def tester():
 
     searchAlgorithms = {
         "BFS": path_BFS,
+        "BFS (bidirectional)": lambda s, e: path_BFS(s, e, Bidirectional=True),
         "DFS": path_DFS,
         "IDDFS": path_IDDFS,
         "A*": path_astar,
         "MinSafe": min_safe,
+        "MinSafe (IDA*)": lambda s, e: min_safe(s, e, IDA=True),
     }
 
     for name, func in searchAlgorithms.items():
@@ -454,6 +1392,39 @@ def tester():
         else:
             print(f"No valid moves found with {name}.")
 
+    print("\n--- Three cheapest safe paths ---")
+    for Moves in safe_paths(start, end, k=3):
+        print(f"Cost {PathCost(start, Moves)}: {Moves}")
+
+    print("\n--- Paths to several end states at once ---")
+    ends = [end, State([[1, 1, 0], [0, 0, 0], [0, 0, 0], [1, 1, 1]]), State([[0, 0, 0], [0, 0, 0], [0, 0, 0], [0, 0, 0]])]
+    for target, Moves in zip(ends, paths_from(start, ends, Cheapest=True)):
+        print(target.grid, "->", Moves)
+
+    print("\n--- Search statistics as JSON ---")
+    compare(start, end, Format="json")
+
+    print("\n--- Budgeted search ---")
+    Control = SearchControl(NodeLimit=2)
+    print("min_safe with 2 expansions:", min_safe(start, end, Control=Control),
+          "| reason:", Control.reason, "| best so far:", Control.best)
+    Control = SearchControl(TimeLimit=1.0)
+    print("min_safe with 1 second:", min_safe(start, end, Control=Control), "| reason:", Control.reason)
+
+    print("\n--- Safety cache ---")
+    print(SAFETY_CACHE.info())
+    with SafetyScope(maxsize=2) as Cache:
+        path_BFS(start, end)
+        print("Scoped cache of 2 boards:", Cache.info())
+    print("Shared cache unchanged:", SAFETY_CACHE.info())
+    Stats = SearchStats()
+    min_safe(start, end, Stats=Stats)
+    Cleared = SearchStats()
+    min_safe(start, end, Heuristic=lambda state, end: ActiveSafetyCache().clear() or 0, Stats=Cleared)
+    print("Cache cleared during a search: safety checks", Cleared.safety_checks,
+          "| cache hits", Cleared.cache_hits, "| same checks as without clearing:",
+          Cleared.safety_checks == Stats.safety_checks)
+
 
 if __name__ == "__main__":
     tester()
\ No newline at end of file
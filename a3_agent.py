@@ -10,8 +10,19 @@ Agent class for the Hinger game
 """
 
 from a1_state import State
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+import math
+import os
+import time
 import timeit
 
+try:
+    import numpy as np
+except ImportError:   # numpy is only needed for batch evaluation
+    np = None
+
 class Agent:
     """
     a. Initialiser, which receives two parameters: size and name. The first
@@ -20,10 +31,40 @@ class Agent:
     name is an optional string representing the agent’s name, with your group
     name as the default value. The initialiser should set up the agent accordingly.
     """ 
-    def __init__(self, size, name='B1'):
+    def __init__(self, size, name='B1', inplace=False, batch=False, table_bits=16, ordering=True, workers=1):
         self.size = size
         self.name = name
-        self.modes = ['minimax', 'alphabeta']
+        self.modes = ['minimax', 'alphabeta', 'pvs']
+        # When True the searches walk the tree on the given State with
+        # apply()/undo() instead of cloning a new State for every child.
+        self.inplace = inplace
+        # When True the leaves below each depth-1 node are scored together
+        # with evaluate_batch() (needs numpy).
+        if batch and np is None:
+            raise ImportError("batch evaluation needs numpy")
+        self.batch = batch
+        # Transposition table of 2**table_bits buckets, kept for the whole
+        # game (see new_game()); table_bits=0 turns it off.
+        self.table_bits = table_bits
+        self.table = TranspositionTable(table_bits) if table_bits else None
+        # Set while a timed move is running (see timed_move()).
+        self.deadline = None
+        self.reached_depth = None
+        # Move ordering for alphabeta_move (see move_rank()): killer moves
+        # by remaining depth and a history score per move, both learnt from
+        # cutoffs and kept for the game.
+        self.ordering = ordering
+        self.killers = {}
+        self.history = {}
+        self.reset_stats()
+        # With more than one worker, alphabeta_move splits the root moves
+        # over a pool of that many processes (see split_alphabeta()). The
+        # pool is started on first use and stopped by close().
+        self.workers = workers
+        self.pool = None
+        # Half-width of the aspiration window pvs_move() searches around a
+        # guessed score (the previous iteration's, in a timed move).
+        self.aspiration = 20.0
 
     """
     b. A sensible __str__ method.
@@ -37,12 +78,16 @@ class Agent:
     If no move is possible (e.g.there are no active cells), return None. Use the best strategy you have
     implemented as the default value for the mode parameter.
     """
-    def move(self, state, mode):
+    def move(self, state, mode, time_budget=None):
         print(f"Agent {self.name} using {mode.upper()} strategy...")
+        if time_budget is not None and mode in self.modes:
+            return self.timed_move(state, mode, time_budget)
         if mode == "minimax":
             return self.minimax_move(state)
         if mode == "alphabeta":
             return self.alphabeta_move(state)
+        if mode == "pvs":
+            return self.pvs_move(state)
         else:
             raise ValueError(f"Unknown mode: {mode}") 
 
@@ -55,6 +100,150 @@ class Agent:
     beta pruning strategy.
     """    
 
+    def new_game(self):
+        """Forgets the positions, killer moves and history stored from the last game."""
+        if self.table is not None:
+            self.table.clear()
+        self.killers = {}
+        self.history = {}
+
+    def close(self):
+        """Stops the worker processes of a parallel agent, if any were started."""
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def reset_stats(self):
+        """
+        Resets the alphabeta_move and pvs_move counters: nodes searched,
+        cutoffs, cutoffs made by the first move tried (a measure of how good
+        the ordering is), the seconds spent ordering moves, and the number of
+        pvs_move re-searches after a null or aspiration window failed.
+        """
+        self.stats = {'nodes': 0, 'cutoffs': 0, 'first_move_cutoffs': 0, 'ordering_seconds': 0.0,
+                      'researches': 0}
+
+    def move_rank(self, state, depth, table_move=None, first=None):
+        """
+        Returns the sort key alphabeta_move orders a node's moves by, as a
+        function of (move, cost). In order: the move given as first (the
+        previous iteration's best), moves on hinger cells (they win the game
+        at once), the transposition table's best move, the killer moves for
+        this depth (moves that caused a cutoff in a sibling), then the rest
+        by history score (cutoffs they caused anywhere, weighted by depth)
+        and finally by move cost, dearest first.
+        """
+        hingers = state.hingerCells()
+        killers = self.killers.get(depth, ())
+        history = self.history
+
+        def rank(move, cost):
+            if move == first:
+                return (0, 0, 0)
+            if move in hingers:
+                return (1, 0, 0)
+            if move == table_move:
+                return (2, 0, 0)
+            if move in killers:
+                return (3, 0, 0)
+            return (4, -history.get(move, 0), -cost)
+        return rank
+
+    def record_cutoff(self, move, depth, index):
+        """Learns from a move that caused a cutoff, for the killer and history ordering."""
+        self.stats['cutoffs'] += 1
+        if index == 0:
+            self.stats['first_move_cutoffs'] += 1
+        killers = self.killers.setdefault(depth, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+        self.history[move] = self.history.get(move, 0) + depth * depth
+
+    def table_key(self, state, max_player):
+        """Key for a position in the transposition table: the board's Zobrist hash and the side to move."""
+        return state.zobrist if max_player else state.zobrist ^ _MIN_TO_MOVE
+
+    def timed_move(self, state, mode, time_budget):
+        """
+        Iterative deepening for move(): searches to depth 1, 2, 3, ... with
+        the given mode until time_budget seconds have passed, each search
+        trying the best move of the one before first (and, for pvs, with
+        an aspiration window around its score), and returns the
+        (score, move) of the deepest search that finished. A search cut off
+        by the deadline is thrown away. The depth reached is kept in
+        reached_depth (0 if not even depth 1 finished, in which case the
+        first legal move is returned with no score).
+        """
+        self.deadline = time.monotonic() + time_budget
+        self.reached_depth = 0
+        best = (None, next((move for _, move, _ in state.moves()), None))
+        try:
+            # No game lasts longer than the counters on the board, so past
+            # that depth the whole tree has been searched.
+            for depth in range(1, sum(state.grid_cells()) + 1):
+                if mode == "minimax":
+                    best = self.minimax_move(state, depth, first=best[1])
+                elif mode == "pvs":
+                    best = self.pvs_move(state, depth, first=best[1], guess=best[0])
+                else:
+                    best = self.alphabeta_move(state, depth=depth, first=best[1])
+                self.reached_depth = depth
+        except SearchTimeout:
+            pass
+        finally:
+            self.deadline = None
+        print(f"Reached depth {self.reached_depth}")
+        return best
+
+    def check_time(self):
+        """Stops a timed move once its deadline has passed."""
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise SearchTimeout()
+
+    def children(self, state, first=None, rank=None, leaves=None):
+        """
+        Yields (child_state, move, cost) for the searches. Normally this is just
+        state.moves(). In inplace mode the same State object is yielded with the
+        move applied, and the move is undone when the generator is resumed or
+        closed, so the caller must not keep the child after moving on.
+        With leaves (the {move: score} of leaf_scores) the children are
+        already scored, so only the moves are yielded, with None in place
+        of the child state.
+        The moves are sorted by rank(move, cost) if given, otherwise only
+        first (if it is one of the moves) is moved to the front.
+        """
+        if rank is None and first is not None:
+            rank = lambda move, cost: move != first
+        if rank is not None:
+            started = time.perf_counter()
+        if leaves is not None:
+            moves = [(move, state.move_cost(*move)) for move in leaves]
+            if rank is not None:
+                moves.sort(key=lambda item: rank(*item))
+                self.stats['ordering_seconds'] += time.perf_counter() - started
+            for move, cost in moves:
+                yield None, move, cost
+            return
+        if not self.inplace or not isinstance(state, State):
+            if rank is None:
+                yield from state.moves()
+                return
+            ordered = sorted(state.moves(), key=lambda child: rank(child[1], child[2]))
+            self.stats['ordering_seconds'] += time.perf_counter() - started
+            yield from ordered
+            return
+        moves = state.legalMoves()
+        if rank is not None:
+            moves = sorted(moves, key=lambda item: rank(*item))
+            self.stats['ordering_seconds'] += time.perf_counter() - started
+        for move, cost in moves:
+            state.apply(*move)
+            try:
+                yield state, move, cost
+            finally:
+                state.undo()
+
     def win(self, state):
        return all(cell == 0 for row in state.grid for cell in row)
     
@@ -74,22 +263,17 @@ class Agent:
 
         hingers = state.numHingers()
         regions = state.numRegions()
-        total_counters = sum(sum(row) for row in state.grid)
-        moves_available = sum(
-            1 for r in range(state.rows)
-            for c in range(state.cols)
-            if state.grid[r][c] > 0
-        )
+        cells = state.grid_cells()
+        total_counters = sum(cells)
+        moves_available = 0
 
         # New: position-based score
-        center_r, center_c = state.rows // 2, state.cols // 2
+        # closer to center gets a bonus (see position_weights)
         position_score = 0
-        for r in range(state.rows):
-            for c in range(state.cols):
-                if state.grid[r][c] > 0:
-                    # closer to center gets a bonus
-                    dist = abs(center_r - r) + abs(center_c - c)
-                    position_score += (2 - dist)
+        for count, weight in zip(cells, position_weights(state.rows, state.cols)):
+            if count > 0:
+                moves_available += 1
+                position_score += weight
 
         score = (
             hingers * 20
@@ -100,69 +284,482 @@ class Agent:
         )
 
         return score
+
+    def evaluate_batch(self, boards):
+        """
+        Scores a stack of boards at once, giving the same values as evaluate().
+        boards is a list of States or an N x rows x cols array of counters.
+        """
+        if not isinstance(boards, np.ndarray):
+            boards = np.array([state.grid for state in boards])
+        features = board_features(boards)
+        scores = (
+            features['hingers'] * 20
+            + features['regions'] * 5
+            + features['moves_available'] * 2
+            - features['total_counters'] * 1.5
+            + features['position_score'] * 1.2
+        )
+        scores[features['total_counters'] == 0] = float('inf')
+        return scores.tolist()
+
+    def leaf_scores(self, state):
+        """
+        Returns {move: score} for every child of state, scoring the whole
+        sibling set with one evaluate_batch() call. The children are built as
+        array slices, and children(leaves=...) then yields just their moves,
+        so no States are made for them.
+        """
+        board = np.array(state.grid)
+        rs, cs = np.nonzero(board > 0)
+        boards = np.repeat(board[None], len(rs), axis=0)
+        boards[np.arange(len(rs)), rs, cs] -= 1
+        scores = self.evaluate_batch(boards)
+        return {(int(r), int(c)): score for r, c, score in zip(rs, cs, scores)}
        
-    def minimax_move(self, state, depth = 3, max_player = True, root = True):
+    def minimax_move(self, state, depth = 3, max_player = True, root = True, first = None):
+        self.check_time()
         #base case:
         if depth == 0 or self.is_terminal(state):
             # print(f"Depth {depth}, Player {'MAX' if max_player else 'MIN'}, Evaluated score: {score}")
         
             return self.evaluate(state), None
         
+        # The same board turns up through different move orders, so a
+        # result already worked out to at least this depth is reused.
+        key = None
+        if self.table is not None:
+            key = self.table_key(state, max_player)
+            entry = self.table.probe(key)
+            if not root and entry is not None and entry.depth >= depth and entry.bound == EXACT:
+                return entry.score, entry.move
+
+        leaf_scores = self.leaf_scores(state) if self.batch and depth == 1 else None
         if max_player:
             best_score = float('-inf')
             best_move = None
-            for new_state, move, cost in state.moves():
-                score, _ = self.minimax_move(new_state, depth-1, False, root = False)
-                if root:
-                    print(f"Move {move} -> score {score}")
-                if score > best_score:
-                    best_score = score
-                    best_move = move
-            return best_score, best_move
+            with closing(self.children(state, first, leaves=leaf_scores)) as children:
+                for new_state, move, cost in children:
+                    if leaf_scores is not None:
+                        score = leaf_scores[move]
+                    else:
+                        score, _ = self.minimax_move(new_state, depth-1, False, root = False)
+                    if root:
+                        print(f"Move {move} -> score {score}")
+                    if score > best_score:
+                        best_score = score
+                        best_move = move
         else:
             best_score = float('inf')
             best_move = None
-            for new_state, move, cost in state.moves():
-                score, _ = self.minimax_move(new_state, depth-1, True, root = False)
-                if score < best_score:
+            with closing(self.children(state, first, leaves=leaf_scores)) as children:
+                for new_state, move, cost in children:
+                    if leaf_scores is not None:
+                        score = leaf_scores[move]
+                    else:
+                        score, _ = self.minimax_move(new_state, depth-1, True, root = False)
+                    if score < best_score:
+                        best_score = score
+                        best_move = move
+        if key is not None:
+            self.table.store(key, depth, best_score, EXACT, best_move)
+        return best_score, best_move
+
+    
+    def alphabeta_move(self, state,alpha=float("-inf"), beta=float("inf"), depth = 3, max_player= True, first=None, root=True):
+        if root and self.workers > 1 and depth > 1:
+            return self.split_alphabeta(state, alpha, beta, depth, max_player, first)
+        # Searched in negamax form (see negamax()) from the side to move,
+        # with the window turned round for MIN; scores come back from MAX's side.
+        color = 1 if max_player else -1
+        if not max_player:
+            alpha, beta = -beta, -alpha
+        score, move = self.negamax(state, alpha, beta, depth, color, first)
+        return color * score, move
+
+    def split_alphabeta(self, state, alpha, beta, depth, max_player, first=None):
+        """
+        alphabeta_move at the root with the moves split over worker
+        processes. The first move (in the usual order) is searched here to
+        get a bound, then the others are searched in parallel with that
+        window. Each worker builds one Agent with this agent's settings when
+        it starts, and clears it with new_game() before every move it
+        searches, so no worker's result depends on which other moves it
+        happened to search before. The
+        results are read back in move order and ties go to the earlier
+        move, as in the sequential search, so the (score, move) returned
+        is the same for any number of workers.
+        """
+        self.check_time()
+        self.stats['nodes'] += 1
+        if self.is_terminal(state):
+            return self.evaluate(state), None
+        table_move = None
+        if self.table is not None:
+            entry = self.table.probe(self.table_key(state, max_player))
+            if entry is not None:
+                table_move = entry.move
+        if self.ordering:
+            rank = self.move_rank(state, depth, table_move, first)
+        else:
+            rank = lambda move, cost: move != first
+        children = sorted(state.moves(), key=lambda child: rank(child[1], child[2]))
+
+        eldest, best_move, _ = children[0]
+        best_score, _ = self.alphabeta_move(eldest, alpha, beta, depth-1, not max_player, root=False)
+        if max_player:
+            alpha = max(alpha, best_score)
+        else:
+            beta = min(beta, best_score)
+        if alpha >= beta or len(children) == 1:
+            return best_score, best_move
+
+        if self.pool is None:
+            settings = dict(size=self.size, name=self.name, inplace=self.inplace, batch=self.batch,
+                            table_bits=self.table_bits, ordering=self.ordering)
+            self.pool = ProcessPoolExecutor(self.workers, initializer=_start_worker, initargs=(settings,))
+        time_left = None if self.deadline is None else self.deadline - time.monotonic()
+        futures = [self.pool.submit(_search_child, child, alpha, beta, depth-1, not max_player, time_left)
+                   for child, _, _ in children[1:]]
+        try:
+            for future, (_, move, _) in zip(futures, children[1:]):
+                score, nodes = future.result()
+                self.stats['nodes'] += nodes
+                if (score > best_score) if max_player else (score < best_score):
                     best_score = score
                     best_move = move
-            return best_score, best_move
+                if (score >= beta) if max_player else (score <= alpha):
+                    break   # cutoff, the rest are not needed
+        finally:
+            for future in futures:
+                future.cancel()
+        return best_score, best_move
 
-    
-    def alphabeta_move(self, state,alpha=float("-inf"), beta=float("inf"), depth = 3, max_player= True):
+    def pvs_move(self, state, depth=3, max_player=True, first=None, guess=None):
+        """
+        Principal variation search: returns (score, move) like
+        alphabeta_move, scores from MAX's side. Given a guessed score, the
+        root is searched with the aspiration window guess +/- aspiration
+        first, and again with the full window only if the score falls
+        outside it.
+        """
+        color = 1 if max_player else -1
+        if guess is not None and not math.isinf(guess):
+            low, high = guess - self.aspiration, guess + self.aspiration
+            alpha, beta = (low, high) if max_player else (-high, -low)
+            score, move = self.negamax(state, alpha, beta, depth, color, first, scout=True)
+            if alpha < score < beta:
+                return color * score, move
+            self.stats['researches'] += 1
+        score, move = self.negamax(state, float('-inf'), float('inf'), depth, color, first, scout=True)
+        return color * score, move
+
+    def negamax(self, state, alpha, beta, depth, color, first=None, scout=False):
+        """
+        The search behind alphabeta_move and pvs_move, in negamax form:
+        scores are from the side to move (color 1 for MAX, -1 for MIN), so
+        one loop serves both sides. The table keeps MAX's scores, and a
+        stored result from at least this depth either settles the node or
+        narrows the window.
+        With scout=True (pvs_move) only the first move, which the ordering
+        makes the likely best, is searched with the full window; the others
+        only with a null window just above alpha, to show they are no
+        better, and are searched again with the full window if one turns
+        out to be.
+        """
+        self.check_time()
+        self.stats['nodes'] += 1
         #base case:
         if depth == 0 or self.is_terminal(state):
-            score =  self.evaluate(state)
-            # print(f"Depth {depth}, Player {'MAX' if max_player else 'MIN'}, Evaluated score: {score}")
-            return score, None
-        
-        if max_player:
-            max_score = float('-inf')
-            best_move = None
-            for new_state, move, cost in state.moves():
-                score, _ = self.alphabeta_move(new_state, alpha, beta, depth-1, False)
-                if score > max_score:
-                    max_score = score
-                    best_move = move
+            return color * self.evaluate(state), None
 
-                alpha = max(alpha, max_score)
+        # Bounds are relative to the window the result was searched with: a
+        # score at or below it is only an upper bound, one at or above it
+        # only a lower bound.
+        key = None
+        table_move = None
+        if self.table is not None:
+            key = self.table_key(state, color == 1)
+            entry = self.table.probe(key)
+            if entry is not None:
+                table_move = entry.move
+            if entry is not None and entry.depth >= depth:
+                score, bound = color * entry.score, _side_bound(entry.bound, color)
+                if bound == EXACT:
+                    return score, entry.move
+                if bound == LOWER:
+                    alpha = max(alpha, score)
+                else:
+                    beta = min(beta, score)
                 if alpha >= beta:
-                    break   # β cutoff → prune
+                    return score, entry.move
+            alpha_start, beta_start = alpha, beta
+
+        leaf_scores = self.leaf_scores(state) if self.batch and depth == 1 else None
+        rank = self.move_rank(state, depth, table_move, first) if self.ordering else None
+        best_score = float('-inf')
+        best_move = None
+        # closing() undoes the last move in inplace mode, also when a
+        # timed move runs out of time part way through.
+        with closing(self.children(state, first, rank, leaf_scores)) as children:
+            for index, (new_state, move, cost) in enumerate(children):
+                if leaf_scores is not None:
+                    score = color * leaf_scores[move]
+                elif not scout or index == 0:
+                    score = -self.negamax(new_state, -beta, -alpha, depth-1, -color, scout=scout)[0]
+                else:
+                    # The smallest window above alpha: scores are floats.
+                    score = -self.negamax(new_state, -math.nextafter(alpha, math.inf), -alpha, depth-1, -color, scout=True)[0]
+                    if alpha < score < beta:
+                        self.stats['researches'] += 1
+                        score = -self.negamax(new_state, -beta, -alpha, depth-1, -color, scout=True)[0]
+                if score > best_score:
+                    best_score = score
+                    best_move = move
+                alpha = max(alpha, score)
+                if alpha >= beta:
+                    self.record_cutoff(move, depth, index)
+                    break   # cutoff → prune
+        if key is not None:
+            bound = _side_bound(_bound(best_score, alpha_start, beta_start), color)
+            self.table.store(key, depth, color * best_score, bound, best_move)
+        return best_score, best_move
+
+# The Agent a split_alphabeta worker process searches with (see _start_worker()).
+_worker_agent = None
+
+
+def _start_worker(settings):
+    """Starts a split_alphabeta worker process: builds its Agent from keyword settings."""
+    global _worker_agent
+    _worker_agent = Agent(**settings)
+
+
+def _search_child(state, alpha, beta, depth, max_player, time_left):
+    """Worker side of Agent.split_alphabeta: searches one root move with the worker's Agent."""
+    agent = _worker_agent
+    agent.new_game()
+    agent.reset_stats()
+    agent.deadline = None if time_left is None else time.monotonic() + time_left
+    score, _ = agent.alphabeta_move(state, alpha, beta, depth, max_player, root=False)
+    return score, agent.stats['nodes']
+
+
+class SearchTimeout(Exception):
+    """Raised inside the searches when a timed move runs out of time."""
+
 
-            return max_score, best_move
+# Bound types of a transposition table entry: the exact score, or only a
+# lower or upper bound on it (the search was cut off by the window).
+EXACT, LOWER, UPPER = 0, 1, 2
+TableEntry = namedtuple('TableEntry', ['key', 'depth', 'score', 'bound', 'move'])
+
+# Mixed into the key when MIN is to move, so the two sides' results for the
+# same board are kept apart.
+_MIN_TO_MOVE = 0x9E3779B97F4A7C15
+
+
+def _bound(score, alpha, beta):
+    """Bound type of a score found with the window (alpha, beta)."""
+    if score <= alpha:
+        return UPPER
+    if score >= beta:
+        return LOWER
+    return EXACT
+
+
+def _side_bound(bound, color):
+    """Bound type seen from the side color (-1 for MIN) of one seen from MAX, or back."""
+    if color == 1 or bound == EXACT:
+        return bound
+    return UPPER if bound == LOWER else LOWER
+
+
+class TranspositionTable:
+    """
+    Fixed-size table of search results for Agent, keyed by Zobrist hash.
+    Each of the 2**bits buckets has two slots: a depth-preferred slot, which
+    a new result only takes over if it comes from at least as deep a search
+    (or is for the same position), and an always-replace slot for the rest,
+    so deep results survive while recent shallow ones are still kept.
+    Memory is fixed however long the game runs.
+    """
+    def __init__(self, bits=16):
+        self.mask = (1 << bits) - 1
+        self.deep = [None] * (1 << bits)
+        self.recent = [None] * (1 << bits)
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key):
+        """Returns the entry stored for key, or None."""
+        self.probes += 1
+        i = key & self.mask
+        for entry in (self.deep[i], self.recent[i]):
+            if entry is not None and entry.key == key:
+                self.hits += 1
+                return entry
+        return None
+
+    def store(self, key, depth, score, bound, move):
+        i = key & self.mask
+        entry = TableEntry(key, depth, score, bound, move)
+        old = self.deep[i]
+        if old is None or old.key == key or depth >= old.depth:
+            self.deep[i] = entry
+            if old is not None and old.key != key:
+                self.recent[i] = old   # the older result moves down a slot
+            elif self.recent[i] is not None and self.recent[i].key == key:
+                self.recent[i] = None
         else:
-            min_score = float('inf')
-            best_move = None
-            for new_state, move, cost in state.moves():
-                score, _ = self.alphabeta_move(new_state,alpha, beta, depth-1, True)
-                if score < min_score:
-                   min_score = score
-                   best_move = move
-                beta = min(beta, min_score)
-                if beta <= alpha:
-                    break   # α cutoff → prune
-            return min_score, best_move
+            self.recent[i] = entry
+
+    def clear(self):
+        self.deep = [None] * len(self.deep)
+        self.recent = [None] * len(self.recent)
+        self.probes = 0
+        self.hits = 0
+
+
+# (rows, cols) -> position weight of every cell, row by row
+_position_weights = {}
+
+
+def position_weights(rows, cols):
+    """
+    Returns the position-score weight of each cell for a board size,
+    2 - (Manhattan distance to the centre), built once per size and shared
+    by every call to Agent.evaluate.
+    """
+    weights = _position_weights.get((rows, cols))
+    if weights is None:
+        center_r, center_c = rows // 2, cols // 2
+        weights = _position_weights[(rows, cols)] = tuple(
+            2 - (abs(center_r - r) + abs(center_c - c)) for r in range(rows) for c in range(cols)
+        )
+    return weights
+
+
+def board_features(boards):
+    """
+    Works out the features used by Agent.evaluate for a whole stack of boards
+    (an N x rows x cols array of counters) with array operations:
+      - neighbour_counts / move_costs: active neighbours of each cell, from a
+        3x3 sum over the padded board (move cost is 1 + that)
+      - total_counters, moves_available, position_score: sums over each board
+      - regions: connected-component labelling, where every active cell takes
+        the largest label among its active neighbours until nothing changes
+      - hingers: regions recounted for every board with one 1-counter cell
+        cleared, all of those boards labelled together
+    Returns a dict of arrays indexed by board.
+    """
+    boards = np.asarray(boards)
+    n, rows, cols = boards.shape
+    active = boards > 0
+
+    neighbour_counts = _window(active.astype(np.int64)) - active
+
+    r_idx, c_idx = np.indices((rows, cols))
+    dist = np.abs(rows // 2 - r_idx) + np.abs(cols // 2 - c_idx)
+    position_score = ((2 - dist) * active).sum(axis=(1, 2))
+
+    regions = _count_regions(active)
+
+    # A cell can only split its region if its active neighbours fall into
+    # two or more groups around it, so only those 1-counter cells get a
+    # board of their own with the cell cleared and recounted.
+    ring = np.zeros(active.shape, dtype=np.int64)
+    padded = np.zeros((n, rows + 2, cols + 2), dtype=np.int64)
+    padded[:, 1:-1, 1:-1] = active
+    for bit, (dr, dc) in enumerate(_RING):
+        ring |= padded[:, 1 + dr:1 + dr + rows, 1 + dc:1 + dc + cols] << bit
+    b, r, c = np.nonzero((boards == 1) & (_RING_GROUPS[ring] > 1))
+    cleared = active[b].copy()
+    cleared[np.arange(len(b)), r, c] = False
+    split = _count_regions(cleared) > regions[b]
+    hingers = np.bincount(b[split], minlength=n)
+
+    return {
+        'hingers': hingers,
+        'regions': regions,
+        'total_counters': boards.sum(axis=(1, 2)),
+        'moves_available': active.sum(axis=(1, 2)),
+        'position_score': position_score,
+        'neighbour_counts': neighbour_counts,
+        'move_costs': (1 + neighbour_counts) * active,
+    }
+
+
+# The 8 neighbours of a cell in order around it, and for every pattern of
+# active neighbours (bit k set = _RING[k] active), how many separate groups
+# they form when they can only join up through each other, not the centre.
+_RING = ((-1, -1), (-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1))
+
+
+def _ring_groups(pattern):
+    """Counts the groups of active neighbours in one ring pattern."""
+    cells = [_RING[k] for k in range(8) if pattern >> k & 1]
+    groups = 0
+    seen = set()
+    for cell in cells:
+        if cell in seen:
+            continue
+        groups += 1
+        seen.add(cell)
+        stack = [cell]
+        while stack:
+            r, c = stack.pop()
+            for other in cells:
+                if other not in seen and abs(other[0] - r) <= 1 and abs(other[1] - c) <= 1:
+                    seen.add(other)
+                    stack.append(other)
+    return groups
+
+
+_RING_GROUPS = np.array([_ring_groups(p) for p in range(256)]) if np is not None else None
+
+
+def _window(values, reduce=None):
+    """
+    Combines every cell of each board with its 3x3 window (the cell and its
+    8 neighbours, cells off the board count as 0) using reduce, e.g. np.add
+    (the default) for a 3x3 convolution with a ones kernel or np.maximum for
+    a max filter.
+    The window is separable, so it is done as a 3-wide pass down the rows
+    followed by one across the columns.
+    """
+    if reduce is None:
+        reduce = np.add   # not a default argument: numpy may not be installed
+    n, rows, cols = values.shape
+    padded = np.zeros((n, rows + 2, cols + 2), dtype=values.dtype)
+    padded[:, 1:-1, 1:-1] = values
+    down = reduce(reduce(padded[:, 0:rows], padded[:, 1:rows + 1]), padded[:, 2:rows + 2])
+    return reduce(reduce(down[:, :, 0:cols], down[:, :, 1:cols + 1]), down[:, :, 2:cols + 2])
+
+
+def _count_regions(active):
+    """
+    Counts the 8-connected regions of each board in a stack of boolean boards.
+    Each active cell starts with its own cell number as its label and
+    repeatedly takes the largest label in its 3x3 window, then jumps to the
+    label held by the cell its label names (which is never smaller), so the
+    labels spread across a region in far fewer rounds than its width. Every
+    region ends up labelled with its largest cell number, and the regions
+    are the cells that kept their own.
+    """
+    n, rows, cols = active.shape
+    own = np.arange(1, rows * cols + 1).reshape(rows, cols)
+    labels = np.where(active, own, 0)
+    while True:
+        spread = np.where(active, _window(labels, np.maximum), 0)
+        flat = spread.reshape(n, rows * cols)
+        jumped = np.take_along_axis(flat, np.maximum(flat - 1, 0), axis=1)
+        spread = np.where(active, jumped.reshape(n, rows, cols), 0)
+        if np.array_equal(spread, labels):
+            break
+        labels = spread
+    return (labels == own).sum(axis=(1, 2))
+
 
 """
 Tester 
@@ -183,8 +780,11 @@ def tester():
     print("\n")
 
 
+    # The transposition table is kept between moves, so each timed run
+    # starts a new game; otherwise later runs only read back the first.
     print("Testing Minimax:")
     def run_minimax():
+        agent.new_game()
         score, move = agent.minimax_move(state)
         # print(score, move)
         print("\n")
@@ -194,6 +794,7 @@ def tester():
 
     print("Testing Alphabeta:")
     def run_alphabeta():
+        agent.new_game()
         score, move = agent.alphabeta_move(state)
         # print(score, move)
         print("\n")
@@ -201,6 +802,64 @@ def tester():
     avg_time = timeit.timeit(run_alphabeta, number=10) / 10
     print(f"Average alphabeta time over 10 runs: {avg_time:.6f} seconds")
 
+    print("Testing in-place Alphabeta:")
+    inplace_agent = Agent((5,4), inplace=True)
+    print("Same result:", inplace_agent.alphabeta_move(state) == agent.alphabeta_move(state))
+    print("Board restored:", state.grid == sa_grid2)
+    avg_time = timeit.timeit(lambda: (inplace_agent.new_game(), inplace_agent.alphabeta_move(state)), number=10) / 10
+    print(f"Average in-place alphabeta time over 10 runs: {avg_time:.6f} seconds")
+
+    print("Testing transposition table:")
+    plain_agent = Agent((5,4), table_bits=0)
+    print("Same result:", plain_agent.alphabeta_move(state) == agent.alphabeta_move(state))
+    print(f"Table probes: {agent.table.probes}, hits: {agent.table.hits}")
+    avg_time = timeit.timeit(lambda: plain_agent.alphabeta_move(state), number=10) / 10
+    print(f"Average alphabeta time without the table over 10 runs: {avg_time:.6f} seconds")
+
+    print("Testing move ordering:")
+    unordered_agent = Agent((5,4), ordering=False)
+    ordered_agent = Agent((5,4))
+    print("Same score:", unordered_agent.alphabeta_move(state, depth=4)[0] == ordered_agent.alphabeta_move(state, depth=4)[0])
+    for label, ab_agent in (("without", unordered_agent), ("with", ordered_agent)):
+        stats = ab_agent.stats
+        print(f"Nodes {label} ordering: {stats['nodes']}, cutoffs: {stats['cutoffs']} "
+              f"({stats['first_move_cutoffs']} by the first move), "
+              f"ordering time: {stats['ordering_seconds']:.6f} seconds")
+
+    print("Testing timed Alphabeta (0.1 seconds):")
+    timed_agent = Agent((5,4), inplace=True)
+    score, move = timed_agent.move(state, "alphabeta", time_budget=0.1)
+    print(f"Move {move} with score {score} at depth {timed_agent.reached_depth}")
+    print("Board restored:", state.grid == sa_grid2)
+
+    print("Testing PVS:")
+    pvs_agent = Agent((5,4))
+    print("Same score:", pvs_agent.pvs_move(state, depth=4)[0] == Agent((5,4)).alphabeta_move(state, depth=4)[0])
+    print(f"Nodes: {pvs_agent.stats['nodes']}, re-searches: {pvs_agent.stats['researches']}")
+    score, move = pvs_agent.move(state, "pvs", time_budget=0.1)
+    print(f"Timed move {move} with score {score} at depth {pvs_agent.reached_depth}")
+
+    print(f"Testing parallel Alphabeta (cores available: {os.cpu_count()}):")
+    serial_result = Agent((5,4)).alphabeta_move(state, depth=4)
+    serial_time = None
+    for workers in (1, 2, 4, 8):
+        parallel_agent = Agent((5,4), workers=workers)
+        same = parallel_agent.alphabeta_move(state, depth=4) == serial_result
+        avg_time = timeit.timeit(lambda: (parallel_agent.new_game(), parallel_agent.alphabeta_move(state, depth=4)), number=10) / 10
+        parallel_agent.close()
+        serial_time = serial_time or avg_time
+        print(f"{workers} workers: same result: {same}, average time over 10 runs: {avg_time:.6f} seconds, "
+              f"speedup: {serial_time / avg_time:.2f}x")
+
+    if np is not None:
+        print("Testing batch Minimax:")
+        batch_agent = Agent((5,4), batch=True)
+        print("Same scores:", batch_agent.evaluate_batch([state]) == [agent.evaluate(state)])
+        avg_time = timeit.timeit(lambda: (batch_agent.new_game(), batch_agent.minimax_move(state)), number=10) / 10
+        print(f"Average batch minimax time over 10 runs: {avg_time:.6f} seconds")
+    else:
+        print("numpy is not installed - agent plays:", Agent((5,4)).alphabeta_move(state)[1])
+
     sa_grid3 = [
             [1, 1, 0, 0, 1],
             [1, 1, 0, 0, 0],
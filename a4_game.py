@@ -11,7 +11,7 @@ Student ID:
 Core gameplay loop for the Hinger game.
 """
 
-from a1_state import State
+from a1_state import State, TrackedState
 from a3_agent import Agent
 
 
@@ -22,13 +22,19 @@ def play(state, agentA, agentB):
     agentA/agentB can be Agent objects or None (for human player).
     Returns the name of the winner, or None for a draw.
     Detects and handles illegal moves.
+    The game is played on a TrackedState copy of state, so region and hinger
+    checks each turn are lookups rather than searches of the board. Agents
+    are given a plain State of the board, which is cheaper to search.
     """
-    CurrentState = state
+    CurrentState = TrackedState(state.grid)
     Players = [agentA, agentB]
     PlayerNames = [
         agentA.name if agentA else "Human A",
         agentB.name if agentB else "Human B"
     ]
+    for Player in Players:
+        if Player is not None and hasattr(Player, "new_game"):
+            Player.new_game()   # stored positions are kept from move to move, not between games
     Turn = 0
     MoveCount = 0
 
@@ -48,14 +54,7 @@ def play(state, agentA, agentB):
         print(CurrentState)
         print()
 
-        IsEmpty = True
-        for r in range(CurrentState.rows):
-            for c in range(CurrentState.cols):
-                if CurrentState.grid[r][c] > 0:
-                    IsEmpty = False
-                    break
-            if not IsEmpty:
-                break
+        IsEmpty = CurrentState.numRegions() == 0
 
         if IsEmpty:
             print("All counters removed - DRAW!")
@@ -64,7 +63,7 @@ def play(state, agentA, agentB):
         if CurrentPlayer is None:
             Move = GetHumanMove(CurrentState)
         else:
-            Move = GetAgentMove(CurrentPlayer, CurrentState)
+            Move = GetAgentMove(CurrentPlayer, State(CurrentState.grid))
             print(f"DEBUG: Agent returned move {Move}")
 
         if Move is None:
@@ -82,9 +81,7 @@ def play(state, agentA, agentB):
 
         WasHinger = IsHinger(CurrentState, r, c)
 
-        NewGrid = [row[:] for row in CurrentState.grid]
-        NewGrid[r][c] -= 1
-        CurrentState = State(NewGrid)
+        CurrentState.apply(r, c)
 
         print(f"{CurrentName} moves at {Move}")
         MoveCount += 1
@@ -136,14 +133,7 @@ def IsHinger(state, r, c):
     if state.grid[r][c] != 1:
         return False
 
-    OriginalRegions = state.numRegions()
-
-    TestGrid = [row[:] for row in state.grid]
-    TestGrid[r][c] = 0
-    TestState = State(TestGrid)
-    NewRegions = TestState.numRegions()
-
-    return NewRegions > OriginalRegions
+    return state.isHinger(r, c)
 
 
 def tester():
@@ -10,7 +10,7 @@ Student ID:
 Graphical interface file for visual gameplay of Hinger game.
 """
 import tkinter as tk
-from a1_state import State
+from a1_state import State, TrackedState
 from a3_agent import Agent
 import tkinter.font as tkfont
 from a4_game import IsHinger, IsValidMove
@@ -24,7 +24,7 @@ initial_grid = [
     [0, 0, 0, 1, 0]
 ]
 
-state = State(initial_grid)
+state = TrackedState(initial_grid)
 buttons = []
 GAME_MODE = "human_vs_agent"  # options: "human_vs_agent", "human_vs_human", "agent_vs_agent"
 
@@ -100,7 +100,7 @@ def on_click(r, c):
         WasHinger = IsHinger(state, r, c)
    
         #make move, and update grid
-        state.grid[r][c] -= 1
+        state.apply(r, c)
         buttons[r][c].config(text=str(state.grid[r][c]))
         update_button_color(r, c)
         print(f"Button clicked at ({r}, {c}) -> New value : {state.grid[r][c]}")
@@ -125,7 +125,7 @@ def agent_move():
     if game_over:
         return
 
-    Score, Move = agentB.move(state, "minimax")
+    Score, Move = agentB.move(State(state.grid), "minimax")
     if Move is None:
         show_end_message("No valid move — Human wins!")
         game_over = True
@@ -133,7 +133,7 @@ def agent_move():
 
     r, c = Move
     WasHinger = IsHinger(state, r, c)
-    state.grid[r][c] -= 1
+    state.apply(r, c)
     buttons[r][c].config(text=str(state.grid[r][c]))
     update_button_color(r, c)
     print(f"Agent moved at {Move}")